@@ -1,170 +1,248 @@
-import cv2
-from ultralytics import YOLO
-import numpy as np
-from gtts import gTTS
-import os
-import time
-import pygame
 import threading
-import sys
-import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-print("Starting program...")
+import cv2
 
-# Инициализация pygame для воспроизведения звука
-try:
+from .audio import AudioEngine, PygamePlayer
+from .backends import load_model, warmup_model
+from .config import config_from_args
+from .detector import Announcer, ObjectDetector
+from .metrics import METRICS, start_metrics_server, start_metrics_logger
+from .pipeline import LatestSlots, CaptureThread, Worker
+from .roi import InferencePlanner, parse_regions
+from .scheduler import DetectionScheduler
+from .sources import open_sources
+from .streaming import FrameBroadcaster, detections_to_json, start_stream_server
+from .tracker import IoUTracker
+from .tts import PhraseCache, create_backend, announcement_text
+
+PREWARM_DISTANCES_COUNT = 10  # Прогрев фраз для расстояний 1..10 шагов округления
+
+
+def _timed(phase, func, *args):
+    """Выполняет фазу запуска и записывает её длительность"""
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    METRICS.observe(f"startup_{phase}", elapsed)
+    return result, elapsed
+
+
+def _load_model(config):
+    # Загружаем модель YOLOv8 на выбранном бэкенде инференса
+    model = load_model(config.model_weights, config.model_backend, config.imgsz, config.int8,
+                       config.calibration, config.model_cache_dir)
+    warmup_model(model, config.imgsz)
+    return model
+
+
+def _init_audio(config):
+    """Инициализация pygame и движка синтеза; pygame импортируется только здесь"""
+    if not config.audio:
+        return None, None
+    import pygame
     pygame.mixer.init()
-    print("Pygame initialized successfully")
-except Exception as e:
-    print(f"Error initializing pygame: {e}")
-    sys.exit(1)
-
-# Загружаем модель YOLOv8
-try:
-    model = YOLO('yolov8n.pt')
-    print("YOLO model loaded successfully")
-except Exception as e:
-    print(f"Error loading YOLO model: {e}")
-    sys.exit(1)
-
-# Подключаем камеру
-cap = cv2.VideoCapture(0)
-
-if not cap.isOpened():
-    print("Error: Could not open camera")
-    sys.exit(1)
-
-print("Camera opened successfully")
-
-# Предполагаемые параметры камеры (можно откалибровать)
-KNOWN_WIDTH = 0.5  # предполагаемая ширина объекта в метрах
-FOCAL_LENGTH = 500  # примерное фокусное расстояние в пикселях
-
-# Словарь для отслеживания объектов
-tracked_objects = {}  # {object_id: (label, last_seen_time)}
-last_speak_time = 0
-SPEAK_COOLDOWN = 1  # Задержка между озвучиваниями в секундах
-OBJECT_TIMEOUT = 2  # Время в секундах, после которого объект считается новым
-
-def calculate_distance(pixel_width):
-    """Рассчитывает расстояние до объекта в метрах"""
-    return (KNOWN_WIDTH * FOCAL_LENGTH) / pixel_width
-
-def play_sound_async(file_path):
-    """Воспроизводит звук в фоновом режиме"""
-    try:
-        pygame.mixer.music.load(file_path)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-    except Exception as e:
-        print(f"Error playing sound: {e}")
-
-def speak_object(label, distance):
-    """Озвучивает обнаруженный объект"""
-    global last_speak_time
-    current_time = time.time()
-    
-    # Проверяем, прошло ли достаточно времени с последнего озвучивания
-    if current_time - last_speak_time < SPEAK_COOLDOWN:
-        return
-        
-    try:
-        text = f"New {label} detected at distance {distance:.1f} meters"
-        print(f"Speaking: {text}")
-        
-        # Создаем временный файл в системной временной директории
-        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
-            temp_path = temp_file.name
-        
-        # Создаем и сохраняем аудио
-        tts = gTTS(text=text, lang='en')
-        tts.save(temp_path)
-        
-        # Воспроизводим звук в отдельном потоке
-        threading.Thread(target=play_sound_async, args=(temp_path,), daemon=True).start()
-        
-        # Удаляем временный файл после небольшой задержки
-        def delete_file():
-            time.sleep(2)  # Увеличиваем время ожидания до 2 секунд
+    phrase_cache = PhraseCache(create_backend(config.tts_backend), config.tts_cache_dir)
+    return phrase_cache, PygamePlayer()
+
+
+def start(config):
+    """Параллельно загружает модель, открывает камеры и поднимает звук.
+
+    Возвращает (model, sources, phrase_cache, player); время каждой фазы
+    печатается и попадает в метрики startup_*.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup") as pool:
+        model_future = pool.submit(_timed, "model", _load_model, config)
+        sources_future = pool.submit(_timed, "camera", open_sources, config.sources)
+        audio_future = pool.submit(_timed, "audio", _init_audio, config)
+
+        errors = []
+        results = {}
+        for phase, future in (("model", model_future), ("camera", sources_future), ("audio", audio_future)):
             try:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
+                results[phase] = future.result()
             except Exception as e:
-                print(f"Error deleting file: {e}")
-        
-        threading.Thread(target=delete_file, daemon=True).start()
-        last_speak_time = current_time
+                errors.append(f"{phase}: {e}")
+
+    if errors:
+        if "camera" in results:
+            for source in results["camera"][0]:
+                source.release()
+        raise RuntimeError("; ".join(errors))
+
+    total = time.perf_counter() - started
+    METRICS.observe("startup_total", total)
+    phases = ", ".join(f"{phase} {results[phase][1]:.2f}s" for phase in ("model", "camera", "audio"))
+    print(f"Startup: {phases}, total {total:.2f}s")
+
+    model = results["model"][0]
+    sources = results["camera"][0]
+    phrase_cache, player = results["audio"][0]
+    return model, sources, phrase_cache, player
+
+
+def run(config):
+    print("Starting program...")
+    try:
+        model, sources, phrase_cache, player = start(config)
+    except RuntimeError as e:
+        print(f"Error during startup: {e}")
+        return 1
+
+    print(f"Opened {len(sources)} video source(s): {', '.join(s.name for s in sources)}")
+
+    # У каждого источника свой трекер: стабильные id треков вместо строк label_x1_y1
+    for source in sources:
+        source.tracker = IoUTracker(iou_threshold=0.3, timeout=config.object_timeout)
+
+    scheduler = DetectionScheduler(every_n=config.detect_every_n, motion_threshold=config.motion_threshold,
+                                   max_duty=config.inference_duty)
+
+    audio_engine = None
+    if phrase_cache is not None:
+        if config.prewarm_tts:
+            # Прогреваем кэш в фоне, чтобы не задерживать старт детекции
+            distances = [config.distance_step * i for i in range(1, PREWARM_DISTANCES_COUNT + 1)]
+            phrases = [announcement_text(label, d, config.distance_step, source=spoken)
+                       for spoken in {s.spoken_name for s in sources}
+                       for label in model.names.values() for d in distances]
+            threading.Thread(target=phrase_cache.prewarm, args=(phrases,), daemon=True).start()
+
+        # Один поток озвучивания с очередью приоритетов вместо потока на каждую фразу
+        audio_engine = AudioEngine(phrase_cache, player, cooldown=config.speak_cooldown,
+                                   max_age=config.announcement_max_age, distance_step=config.distance_step)
+        METRICS.gauge("tts_cache_hits", lambda: phrase_cache.hits)
+        METRICS.gauge("tts_cache_disk_hits", lambda: phrase_cache.disk_hits)
+        METRICS.gauge("tts_cache_misses", lambda: phrase_cache.misses)
+
+    planner = None
+    if config.full_scan_every > 1 or config.roi or config.max_inference_latency:
+        if config.model_backend == "torch":
+            # Размер входа и кропы выбираются на каждом кадре; полный кадр на imgsz — периодически
+            planner = InferencePlanner(max_size=config.imgsz, min_size=config.min_imgsz,
+                                       full_scan_every=config.full_scan_every,
+                                       max_latency=config.max_inference_latency, regions=parse_regions(config.roi))
+        else:
+            print(f"Dynamic input size is not available for the {config.model_backend} backend, "
+                  f"using fixed {config.imgsz}px")
+
+    announcer = Announcer(audio_engine, urgent_distance=config.urgent_distance)
+    detector = ObjectDetector(model, sources, scheduler, announcer, config.known_width, config.focal_length,
+                              conf_threshold=config.conf_threshold, predict_kwargs={"imgsz": config.imgsz},
+                              planner=planner)
+
+    # Конвейер: захват -> инференс -> отрисовка. Между стадиями хранится только
+    # самый свежий кадр каждого источника, поэтому скорость ограничена самой
+    # медленной стадией, а не суммой всех.
+    stop_event = threading.Event()
+    frame_queue = LatestSlots(producers=len(sources))
+    result_queue = LatestSlots(key=lambda item: item[0].source)
+    capture_threads = [CaptureThread(s.cap, frame_queue, stop_event, source=s.index, fps=s.playback_fps())
+                       for s in sources]
+    inference_thread = Worker("inference", detector.process, frame_queue, result_queue, stop_event)
+
+    METRICS.gauge("capture_dropped_frames", lambda: frame_queue.dropped)
+    METRICS.gauge("render_dropped_frames", lambda: result_queue.dropped)
+    METRICS.gauge("active_tracks", lambda: sum(len(s.tracker) for s in sources))
+    METRICS.gauge("inference_interval_seconds", lambda: round(scheduler.min_interval(), 4))
+    metrics_server = None
+    if config.metrics_port:
+        try:
+            metrics_server = start_metrics_server(METRICS, port=config.metrics_port)
+            print(f"Metrics available at http://127.0.0.1:{config.metrics_port}/metrics")
+        except OSError as e:
+            print(f"Error starting metrics server: {e}")
+    if config.metrics_log_interval > 0:
+        start_metrics_logger(METRICS, config.metrics_log_interval, stop_event)
+
+    # Сетевой поток: JPEG кодируется один раз на кадр в отдельном потоке и раздаётся всем зрителям
+    broadcasters = []
+    stream_server = None
+    if config.stream_port:
+        def json_for(name):
+            return lambda packet, detections: detections_to_json(name, packet, detections, detector.labels)
+
+        broadcasters = [FrameBroadcaster(json_for(s.name), config.stream_quality, config.stream_max_fps)
+                        for s in sources]
+        try:
+            stream_server = start_stream_server(broadcasters, port=config.stream_port)
+            print(f"Streaming at http://0.0.0.0:{config.stream_port}/stream/<n>.mjpg "
+                  f"(detections: /detections/<n>)")
+        except OSError as e:
+            print(f"Error starting stream server: {e}")
+            broadcasters = []
+
+    if config.display:
+        print("Press 'ESC' to exit the program")
+    else:
+        print("Running headless, press Ctrl+C to exit")
+
+    try:
+        if audio_engine is not None:
+            audio_engine.start()
+        for thread in capture_threads:
+            thread.start()
+        inference_thread.start()
+
+        # Отрисовка остаётся в главном потоке: imshow/waitKey не потокобезопасны
+        while not stop_event.is_set():
+            items = result_queue.get(timeout=0.05)
+            if items is None and result_queue.closed:
+                break
+            for packet, detections in items or ():
+                if config.display or broadcasters:
+                    with METRICS.timer("draw"):
+                        detector.draw(packet.image, detections)
+                if broadcasters:
+                    broadcasters[packet.source].publish(packet, detections)
+                if config.display:
+                    with METRICS.timer("imshow"):
+                        cv2.imshow(sources[packet.source].window_name, packet.image)
+                # Задержка «от камеры до экрана»
+                METRICS.observe("end_to_end", time.monotonic() - packet.captured_at)
+                METRICS.inc("frames_rendered")
+
+            if config.display:
+                with METRICS.timer("wait_key"):
+                    key = cv2.waitKey(1)
+                if key & 0xFF == 27:  # Нажми Esc чтобы выйти
+                    print("ESC pressed, exiting...")
+                    break
+
+    except KeyboardInterrupt:
+        print("Interrupted, exiting...")
     except Exception as e:
-        print(f"Error in speak_object: {e}")
-
-print("Press 'ESC' to exit the program")
-
-try:
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Error: Could not get frame")
-            break
-
-        # Получаем предсказания модели
-        results = model(frame, stream=True)
-        current_time = time.time()
-
-        # Создаем множество текущих объектов
-        current_objects = set()
-
-        # Отображаем найденные объекты
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                try:
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])  # координаты
-                    conf = float(box.conf[0])              # уверенность
-                    cls = int(box.cls[0])                  # класс
-
-                    # Рассчитываем расстояние
-                    pixel_width = x2 - x1
-                    distance = calculate_distance(pixel_width)
-
-                    label = model.names[cls]
-                    
-                    # Создаем уникальный идентификатор объекта
-                    object_id = f"{label}_{x1}_{y1}"
-                    current_objects.add(object_id)
-                    
-                    # Проверяем, является ли объект новым
-                    if conf > 0.5:  # Проверяем уверенность
-                        if object_id not in tracked_objects:
-                            # Новый объект
-                            speak_object(label, distance)
-                            tracked_objects[object_id] = (label, current_time)
-                        else:
-                            # Обновляем время последнего обнаружения
-                            tracked_objects[object_id] = (label, current_time)
-
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.putText(frame, f"{label} {conf:.2f} {distance:.2f}m", (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                except Exception as e:
-                    print(f"Error processing box: {e}")
-                    continue
-
-        # Удаляем объекты, которые не были обнаружены в текущем кадре
-        tracked_objects = {obj_id: (label, time) for obj_id, (label, time) in tracked_objects.items() 
-                         if obj_id in current_objects}
-
-        cv2.imshow("YOLOv8 - Object Detection", frame)
-
-        if cv2.waitKey(1) & 0xFF == 27:  # Нажми Esc чтобы выйти
-            print("ESC pressed, exiting...")
-            break
-
-except Exception as e:
-    print(f"Main loop error: {e}")
-finally:
-    print("Cleaning up...")
-    cap.release()
-    cv2.destroyAllWindows()
-    pygame.quit()
-    print("Program finished")
+        print(f"Main loop error: {e}")
+    finally:
+        print("Cleaning up...")
+        stop_event.set()
+        for thread in capture_threads:
+            thread.join(timeout=1)
+        inference_thread.join(timeout=1)
+        if audio_engine is not None:
+            audio_engine.close()
+            audio_engine.join(timeout=1)
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        for broadcaster in broadcasters:
+            broadcaster.close()
+        if stream_server is not None:
+            stream_server.shutdown()
+        print(METRICS.log_line())
+        for source in sources:
+            source.release()
+        if config.display:
+            cv2.destroyAllWindows()
+        if config.audio:
+            import pygame
+            pygame.quit()
+        print("Program finished")
+    return 0
+
+
+def main(argv=None):
+    return run(config_from_args(argv))
+
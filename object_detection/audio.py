@@ -0,0 +1,138 @@
+import heapq
+import io
+import itertools
+import threading
+import time
+
+from .metrics import METRICS
+from .tts import announcement_text
+
+# Приоритеты объявлений: срочные (объект совсем близко) прерывают обычные
+PRIORITY_NORMAL = 0
+PRIORITY_URGENT = 1
+
+
+class PygamePlayer:
+    """Воспроизведение аудио из памяти через pygame.mixer.music, без временных файлов"""
+
+    def __init__(self):
+        import pygame
+        self._music = pygame.mixer.music
+
+    def play(self, audio_data, namehint):
+        self._music.load(io.BytesIO(audio_data), namehint)
+        self._music.play()
+
+    def busy(self):
+        return self._music.get_busy()
+
+    def stop(self):
+        self._music.stop()
+
+
+class AudioEngine(threading.Thread):
+    """Единственный поток озвучивания с очередью приоритетов.
+
+    Объявления копятся в куче, пока играет текущий клип или не прошёл
+    cooldown. Затем берётся самое приоритетное, а все ожидающие объявления
+    с той же меткой и того же источника сливаются в одну фразу
+    («2 persons detected ...»).
+    Объявления старше max_age выбрасываются. Срочное объявление прерывает
+    обычный клип. Синтез и выборка из кэша тоже идут здесь, а не в потоке
+    инференса. player=None — без звука (headless).
+    """
+
+    def __init__(self, phrase_cache, player=None, cooldown=1.0, max_age=3.0, distance_step=0.5,
+                 poll_interval=0.05, verbose=True):
+        super().__init__(name="audio", daemon=True)
+        self.phrase_cache = phrase_cache
+        self.player = player
+        self.cooldown = cooldown
+        self.max_age = max_age
+        self.distance_step = distance_step
+        self.poll_interval = poll_interval
+        self.verbose = verbose
+        self._heap = []  # (-priority, created_at, seq, label, distance, source)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._last_start = 0.0
+        self.played = 0
+
+    def submit(self, label, distance, priority=PRIORITY_NORMAL, source=None):
+        with self._cond:
+            heapq.heappush(self._heap, (-priority, time.monotonic(), next(self._seq), label, distance, source))
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _urgent_pending(self):
+        return bool(self._heap) and -self._heap[0][0] >= PRIORITY_URGENT
+
+    def _take_next(self):
+        """Снимает с кучи самое приоритетное объявление и сливает с ним одинаковые.
+
+        Возвращает (priority, label, count, nearest_distance, source) или None, если ждать.
+        Вызывается под self._cond.
+        """
+        now = time.monotonic()
+        stale = [item for item in self._heap if now - item[1] > self.max_age]
+        if stale:
+            METRICS.inc("announcements_stale", len(stale))
+            self._heap = [item for item in self._heap if now - item[1] <= self.max_age]
+            heapq.heapify(self._heap)
+        if not self._heap:
+            return None
+
+        if not self._urgent_pending() and now - self._last_start < self.cooldown:
+            return None
+
+        neg_priority, _, _, label, _, source = self._heap[0]
+        same = [item for item in self._heap if item[3] == label and item[5] == source]
+        self._heap = [item for item in self._heap if item[3] != label or item[5] != source]
+        heapq.heapify(self._heap)
+        if len(same) > 1:
+            METRICS.inc("announcements_merged", len(same) - 1)
+        return -neg_priority, label, len(same), min(item[4] for item in same), source
+
+    def run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    announcement = self._take_next()
+                    if announcement is not None:
+                        break
+                    self._cond.wait(self.poll_interval if self._heap else None)
+
+            priority, label, count, distance, source = announcement
+            try:
+                self._speak(priority, label, count, distance, source)
+            except Exception as e:
+                METRICS.inc("announcement_errors")
+                print(f"Error in audio engine: {e}")
+
+    def _speak(self, priority, label, count, distance, source=None):
+        text = announcement_text(label, distance, self.distance_step, count, source)
+        if self.verbose:
+            print(f"Speaking: {text}")
+        # Берём аудио из кэша; синтез происходит только при первом появлении фразы
+        audio_data = self.phrase_cache.get(text)
+        self._last_start = time.monotonic()
+        self.played += 1
+        if self.player is None:
+            return
+
+        self.player.play(audio_data, self.phrase_cache.backend.extension)
+        # Ждём конца клипа на условной переменной: срочное объявление прерывает обычный клип
+        with self._cond:
+            while self.player.busy() and not self._closed:
+                if priority < PRIORITY_URGENT and self._urgent_pending():
+                    self.player.stop()
+                    METRICS.inc("announcements_interrupted")
+                    break
+                self._cond.wait(self.poll_interval)
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+# Бэкенд инференса -> формат экспорта ultralytics (None = исходная модель PyTorch)
+EXPORT_FORMATS = {
+    "torch": None,
+    "onnx": "onnx",
+    "openvino": "openvino",
+}
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def artifact_path(weights, backend, imgsz, int8, cache_dir):
+    """Путь к экспортированной модели: ключ — хэш весов, бэкенд, размер входа и INT8.
+
+    Суффикс dyn отличает экспорт с динамическим батчем от прежних
+    статических артефактов с батчем 1, которые могли остаться в кэше.
+    """
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    name = f"{stem}-{file_hash(weights)}-{backend}-{imgsz}-dyn{'-int8' if int8 else ''}"
+    if backend == "onnx":
+        return os.path.join(cache_dir, name + ".onnx")
+    # OpenVINO экспортируется в каталог; имя должно оканчиваться на _openvino_model
+    return os.path.join(cache_dir, name + "_openvino_model")
+
+
+def load_calibration_frames(source, limit=64):
+    """Кадры для калибровки INT8: каталог изображений или видеофайл"""
+    frames = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                frame = cv2.imread(os.path.join(source, name))
+                if frame is not None:
+                    frames.append(frame)
+            if len(frames) >= limit:
+                break
+        return frames
+
+    cap = cv2.VideoCapture(source)
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or limit
+        step = max(total // limit, 1)
+        index = 0
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % step == 0:
+                frames.append(frame)
+            index += 1
+    finally:
+        cap.release()
+    return frames
+
+
+def _calibration_dataset(frames, names, work_dir):
+    """Мини-датасет в формате ultralytics из кадров (для калибровки OpenVINO через NNCF)"""
+    images_dir = os.path.join(work_dir, "images")
+    os.makedirs(images_dir, exist_ok=True)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(images_dir, f"{i:04d}.jpg"), frame)
+    yaml_path = os.path.join(work_dir, "calibration.yaml")
+    with open(yaml_path, "w", encoding="utf-8") as f:
+        f.write(f"path: {work_dir}\ntrain: images\nval: images\nnames:\n")
+        for i, name in sorted(names.items()):
+            f.write(f"  {i}: {name}\n")
+    return yaml_path
+
+
+def _preprocess(frame, imgsz):
+    image = cv2.resize(frame, (imgsz, imgsz), interpolation=cv2.INTER_LINEAR)
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+    return np.ascontiguousarray(image.transpose(2, 0, 1)[None])
+
+
+def _quantize_onnx(fp32_path, int8_path, frames, imgsz):
+    """Статическая INT8-квантизация ONNX, откалиброванная на кадрах камеры"""
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationDataReader, QuantType, quantize_static
+
+    input_name = onnxruntime.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._inputs = iter({input_name: _preprocess(f, imgsz)} for f in frames)
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    quantize_static(fp32_path, int8_path, FrameReader(), weight_type=QuantType.QInt8,
+                    activation_type=QuantType.QUInt8)
+
+
+def export_model(weights, backend, imgsz, int8, calibration, target):
+    """Экспортирует модель в формат бэкенда и атомарно кладёт результат в target"""
+    from ultralytics import YOLO
+
+    fmt = EXPORT_FORMATS[backend]
+    frames = load_calibration_frames(calibration) if int8 and calibration else []
+    if int8 and not frames:
+        raise ValueError("INT8 export needs calibration frames (an image directory or a video file)")
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(target)) as work_dir:
+        # Экспорт ultralytics пишет рядом с весами, поэтому работаем с копией во временном каталоге
+        local_weights = os.path.join(work_dir, os.path.basename(weights))
+        shutil.copy2(weights, local_weights)
+        model = YOLO(local_weights)
+
+        # По умолчанию экспорт статический с батчем 1, а детектор отправляет кадры
+        # всех камер одним вызовом: батч (и размер входа для кропов ROI) — динамические
+        if backend == "openvino":
+            data = _calibration_dataset(frames, model.names, work_dir) if int8 else None
+            exported = model.export(format=fmt, imgsz=imgsz, dynamic=True, int8=int8, data=data)
+        else:
+            exported = model.export(format=fmt, imgsz=imgsz, dynamic=True)
+            if int8:
+                quantized = os.path.join(work_dir, "model-int8.onnx")
+                _quantize_onnx(exported, quantized, frames, imgsz)
+                exported = quantized
+
+        os.replace(exported, target)
+    return target
+
+
+def load_model(weights="yolov8n.pt", backend="torch", imgsz=640, int8=False, calibration=None,
+               cache_dir=None):
+    """Загружает детектор на выбранном бэкенде, экспортируя его один раз в кэш на диске"""
+    from ultralytics import YOLO
+
+    if backend not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    if backend == "torch":
+        return YOLO(weights)
+
+    if not os.path.exists(weights):
+        # Стандартные веса ultralytics скачивает при первой загрузке
+        YOLO(weights)
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "sign-er-models")
+    os.makedirs(cache_dir, exist_ok=True)
+    target = artifact_path(weights, backend, imgsz, int8, cache_dir)
+    if not os.path.exists(target):
+        print(f"Exporting {weights} to {backend}{' INT8' if int8 else ''} at {imgsz}px...")
+        export_model(weights, backend, imgsz, int8, calibration, target)
+    return YOLO(target, task="detect")
+
+
+def warmup_model(model, imgsz=640, runs=2, **predict_kwargs):
+    """Прогревает модель до первого кадра: выделение памяти и компиляция графа"""
+    blank = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for _ in range(runs):
+        model(blank, imgsz=imgsz, verbose=False, **predict_kwargs)
@@ -0,0 +1,257 @@
+"""Headless-бенчмарк детектора: прогоняет записанные видео через ту же
+детекцию, трекинг и озвучивание, что и app.py, без окна и звука.
+
+Пример:
+    python -m object_detection.benchmark street.mp4 --model yolov8n.pt --imgsz 480 --output result.json
+    python -m object_detection.benchmark street.mp4 --backend openvino --int8 --calibration street.mp4 --compare-to torch
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from .audio import AudioEngine
+from .backends import EXPORT_FORMATS, load_model, warmup_model
+from .detector import Announcer, ObjectDetector
+from .metrics import METRICS, percentiles
+from .pipeline import FramePacket
+from .postprocess import extract_detections, detection_boxes
+from .roi import InferencePlanner, parse_regions
+from .scheduler import DetectionScheduler
+from .sources import open_sources
+from .tracker import IoUTracker, iou_matrix
+
+
+def peak_memory_mb():
+    # На Linux ru_maxrss в килобайтах
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def match_counts(detections, reference, iou_threshold=0.5):
+    """(TP, FP, FN) детекций относительно эталона: жадное сопоставление по IoU внутри класса"""
+    if len(detections) == 0 or len(reference) == 0:
+        return 0, len(detections), len(reference)
+    iou = iou_matrix(detection_boxes(detections).astype(np.float32),
+                     detection_boxes(reference).astype(np.float32))
+    iou[detections["cls"][:, None] != reference["cls"][None, :]] = 0
+    matched = 0
+    used_det = np.zeros(len(detections), dtype=bool)
+    used_ref = np.zeros(len(reference), dtype=bool)
+    for flat in np.argsort(iou, axis=None)[::-1]:
+        d, r = divmod(int(flat), len(reference))
+        if iou[d, r] < iou_threshold:
+            break
+        if used_det[d] or used_ref[r]:
+            continue
+        used_det[d] = used_ref[r] = True
+        matched += 1
+    return matched, len(detections) - matched, len(reference) - matched
+
+
+def agreement(tp, fp, fn):
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    f1 = 2 * precision * recall / (precision + recall) if precision and recall else None
+    return {"precision": precision and round(precision, 4), "recall": recall and round(recall, 4),
+            "f1": f1 and round(f1, 4)}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Replay videos through the detector and report JSON metrics")
+    parser.add_argument("videos", nargs="+", help="video files; several files are processed as a multi-camera batch")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--backend", default="torch", choices=sorted(EXPORT_FORMATS))
+    parser.add_argument("--int8", action="store_true", help="INT8-quantize the exported model (onnx/openvino)")
+    parser.add_argument("--calibration", default=None, help="image directory or video used for INT8 calibration")
+    parser.add_argument("--model-cache-dir", default=None, help="where exported models are cached")
+    parser.add_argument("--compare-to", default=None, choices=sorted(EXPORT_FORMATS),
+                        help="reference backend for accuracy agreement (forces detection on every frame)")
+    parser.add_argument("--imgsz", type=int, default=640, help="inference resolution")
+    parser.add_argument("--min-imgsz", type=int, default=320)
+    parser.add_argument("--full-scan-every", type=int, default=1,
+                        help="full-frame scan interval; in between only crops around tracks are detected "
+                             "(default: always full frame)")
+    parser.add_argument("--max-latency", type=float, default=None,
+                        help="target seconds per model call for dynamic input size")
+    parser.add_argument("--roi", default=None,
+                        help='fixed regions of interest as frame fractions "x1,y1,x2,y2;..." '
+                             "(requires --full-scan-every > 1)")
+    parser.add_argument("--every-n", type=int, default=1,
+                        help="keyframe interval of the detection scheduler (1 = detect every frame)")
+    parser.add_argument("--motion-threshold", type=float, default=6.0)
+    parser.add_argument("--duty", type=float, default=None,
+                        help="CPU budget of the detection scheduler (default: no budget)")
+    parser.add_argument("--max-frames", type=int, default=None, help="stop after this many frames per source")
+    parser.add_argument("--warmup", type=int, default=3, help="batches excluded from the statistics")
+    parser.add_argument("--draw", action="store_true", help="include box drawing in the measured latency")
+    parser.add_argument("--tts", default=None,
+                        help="TTS backend to exercise the phrase cache with (audio is never played)")
+    parser.add_argument("--tts-cache-dir", default=os.path.join(tempfile.gettempdir(), "sign-er-tts"))
+    parser.add_argument("--output", default=None, help="write the JSON report to this file instead of stdout")
+    return parser
+
+
+def run(args):
+    if args.roi and args.full_scan_every <= 1:
+        raise ValueError("--roi requires --full-scan-every > 1 (regions are only cropped between full scans)")
+    if args.compare_to:
+        # Сравнение с эталоном имеет смысл, только если модель работает на каждом кадре
+        args.every_n, args.duty = 1, None
+
+    model = load_model(args.model, args.backend, args.imgsz, args.int8, args.calibration, args.model_cache_dir)
+    warmup_model(model, args.imgsz)
+    reference = None
+    if args.compare_to:
+        reference = load_model(args.model, args.compare_to, args.imgsz, cache_dir=args.model_cache_dir)
+        warmup_model(reference, args.imgsz)
+
+    sources = open_sources(args.videos)
+    for source in sources:
+        source.tracker = IoUTracker(iou_threshold=0.3, timeout=2)
+
+    phrase_cache = audio_engine = None
+    if args.tts:
+        from .tts import PhraseCache, create_backend
+        phrase_cache = PhraseCache(create_backend(args.tts), args.tts_cache_dir)
+        # Звуковой движок без проигрывателя: очередь, слияние и кэш работают, звука нет
+        audio_engine = AudioEngine(phrase_cache, player=None, verbose=False)
+        audio_engine.start()
+
+    scheduler = DetectionScheduler(every_n=args.every_n, motion_threshold=args.motion_threshold,
+                                   max_duty=args.duty)
+    announcer = Announcer(audio_engine)
+    planner = None
+    if args.full_scan_every > 1 or args.roi or args.max_latency:
+        if args.backend != "torch":
+            raise ValueError("Dynamic input size and regions of interest need the torch backend")
+        planner = InferencePlanner(max_size=args.imgsz, min_size=args.min_imgsz, full_scan_every=args.full_scan_every,
+                                   max_latency=args.max_latency, regions=parse_regions(args.roi))
+    predict_kwargs = {"imgsz": args.imgsz}
+    detector = ObjectDetector(model, sources, scheduler, announcer, predict_kwargs=predict_kwargs, planner=planner)
+
+    latencies = []
+    frames = 0
+    batches = 0
+    detections = 0
+    tp = fp = fn = 0
+    reference_wall = reference_cpu = 0.0  # время эталона исключается из замеров
+    index = 0
+    wall_started = cpu_started = None
+
+    try:
+        while args.max_frames is None or index < args.max_frames:
+            packets = []
+            for source in sources:
+                ret, frame = source.cap.read()
+                if ret:
+                    packets.append(FramePacket(source.index, index, time.monotonic(), frame))
+            if not packets:
+                break
+            index += 1
+
+            reference_detections = {}
+            if reference is not None and batches >= args.warmup:
+                # Эталон считается до замера, на нетронутых кадрах
+                ref_started, ref_cpu = time.perf_counter(), time.process_time()
+                for packet, result in zip(packets, reference([p.image for p in packets], verbose=False,
+                                                             imgsz=args.imgsz)):
+                    reference_detections[packet.source] = extract_detections([result], 0.5, 500)
+                if batches > args.warmup:
+                    reference_wall += time.perf_counter() - ref_started
+                    reference_cpu += time.process_time() - ref_cpu
+
+            cpu_before = time.process_time()
+            started = time.perf_counter()
+            outputs = detector.process(packets)
+            if args.draw:
+                for packet, dets in outputs:
+                    detector.draw(packet.image, dets)
+            elapsed = time.perf_counter() - started
+
+            batches += 1
+            if batches == args.warmup + 1:
+                wall_started, cpu_started = started, cpu_before
+            if batches > args.warmup:
+                # Задержка кадра = время обработки пакета, в который он попал
+                latencies.extend([elapsed] * len(packets))
+                frames += len(packets)
+                detections += sum(len(dets) for _, dets in outputs)
+                for packet, dets in outputs:
+                    if packet.source in reference_detections:
+                        ref = reference_detections[packet.source]
+                        counts = match_counts(dets[dets["conf"] > detector.conf_threshold],
+                                              ref[ref["conf"] > detector.conf_threshold])
+                        tp, fp, fn = tp + counts[0], fp + counts[1], fn + counts[2]
+    finally:
+        for source in sources:
+            source.release()
+        if audio_engine is not None:
+            audio_engine.close()
+            audio_engine.join(timeout=5)
+
+    wall = time.perf_counter() - wall_started - reference_wall if wall_started is not None else 0.0
+    cpu = time.process_time() - cpu_started - reference_cpu if cpu_started is not None else 0.0
+    report = {
+        "config": {
+            "videos": args.videos,
+            "model": args.model,
+            "backend": args.backend,
+            "int8": args.int8,
+            "imgsz": args.imgsz,
+            "min_imgsz": args.min_imgsz if planner else None,
+            "full_scan_every": args.full_scan_every,
+            "max_latency": args.max_latency,
+            "roi": args.roi,
+            "every_n": args.every_n,
+            "duty": args.duty,
+            "draw": args.draw,
+            "tts": args.tts,
+        },
+        "frames": frames,
+        "warmup_batches": min(batches, args.warmup),
+        "wall_seconds": round(wall, 3),
+        "fps": round(frames / wall, 2) if wall > 0 else None,
+        "latency_ms": percentiles(latencies, scale=1000, digits=3),
+        "cpu_percent": round(100 * cpu / wall, 1) if wall > 0 else None,
+        "peak_memory_mb": peak_memory_mb(),
+        "inference_calls": detector.inference_calls,
+        "smoothed_inference_ms": round(scheduler.inference_time * 1000, 3),
+        "detections": detections,
+        "roi_crops": METRICS.snapshot()["counters"].get("roi_crops", 0),
+        "announcements": announcer.announced,
+        "stage_seconds": METRICS.snapshot()["timings"],
+    }
+    if reference is not None:
+        report["agreement"] = {"reference_backend": args.compare_to, "iou_threshold": 0.5,
+                               **agreement(tp, fp, fn)}
+    if phrase_cache is not None:
+        report["clips_spoken"] = audio_engine.played
+        report["tts_cache"] = {"memory_hits": phrase_cache.hits, "disk_hits": phrase_cache.disk_hits,
+                               "misses": phrase_cache.misses}
+    return report
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        report = run(args)
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import argparse
+import os
+import tempfile
+from dataclasses import dataclass, field
+
+from .roi import parse_regions
+from .sources import parse_sources
+
+
+def _env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class DetectorConfig:
+    """Настройки детектора. Значения по умолчанию можно переопределить переменными окружения"""
+
+    # Камеры: индексы устройств, файлы или URL потоков
+    sources: list = field(default_factory=lambda: [0])
+
+    # Модель и бэкенд инференса
+    model_weights: str = "yolov8n.pt"
+    model_backend: str = "torch"  # "torch", "onnx" или "openvino"
+    imgsz: int = 640  # Разрешение входа модели (наибольшее при динамическом выборе)
+    int8: bool = False  # INT8-квантизация (onnx/openvino)
+    calibration: str = None  # Каталог кадров или видео для калибровки INT8
+    model_cache_dir: str = None  # Где хранить экспортированные модели
+
+    # Динамическое разрешение и области интереса (только torch: экспорт имеет фиксированный вход)
+    min_imgsz: int = 320  # Наименьший размер входа для полного кадра
+    # Каждый N-й инференс — полный кадр на imgsz, между ними только кропы вокруг треков.
+    # По умолчанию 1 (без кропов): новый объект вне треков иначе ждёт до N-1 инференсов
+    full_scan_every: int = 1
+    max_inference_latency: float = None  # Желаемое время вызова модели, с; None — без ограничения
+    roi: str = None  # Постоянные области интереса "x1,y1,x2,y2;..." в долях кадра
+
+    # Предполагаемые параметры камеры (можно откалибровать)
+    known_width: float = 0.5  # предполагаемая ширина объекта в метрах
+    focal_length: float = 500  # примерное фокусное расстояние в пикселях
+
+    conf_threshold: float = 0.5  # Минимальная уверенность для отслеживания и озвучивания
+    object_timeout: float = 2  # Время в секундах, после которого объект считается новым
+
+    # Адаптивная частота детекции: по движению, каждый N-й кадр и в рамках бюджета CPU
+    detect_every_n: int = 5  # 1 = инференс на каждом кадре
+    motion_threshold: float = 6.0  # Средняя разница яркости уменьшенных кадров для запуска детекции
+    inference_duty: float = 0.8  # Допустимая доля времени, занятая инференсом
+
+    # Озвучивание
+    audio: bool = True
+    tts_backend: str = "gtts"  # "gtts" или "pyttsx3" (без сети)
+    tts_cache_dir: str = field(default_factory=lambda: os.path.join(tempfile.gettempdir(), "sign-er-tts"))
+    distance_step: float = 0.5  # Шаг округления расстояния в озвучиваемых фразах, м
+    prewarm_tts: bool = False  # Синтезировать фразы заранее
+    speak_cooldown: float = 1  # Минимальный интервал между началами фраз в секундах
+    announcement_max_age: float = 3  # Объявления старше этого (с) уже неактуальны и пропускаются
+    urgent_distance: float = 1.0  # Объекты ближе (м) озвучиваются вне очереди
+
+    # Вывод и метрики
+    display: bool = True  # Окно cv2.imshow
+    stream_port: int = 0  # HTTP-поток MJPEG с размеченными кадрами (0 = выключен)
+    stream_quality: int = 80  # Качество JPEG для потока
+    stream_max_fps: float = 15  # Верхняя граница частоты кадров на одного зрителя
+    metrics_port: int = 0  # Локальный HTTP-эндпоинт метрик (0 = выключен)
+    metrics_log_interval: float = 10  # Период строки метрик в логе (0 = выключено)
+
+
+def build_parser():
+    env = os.environ.get
+    defaults = DetectorConfig()
+    parser = argparse.ArgumentParser(prog="python -m object_detection",
+                                     description="Real-time object detection with spoken announcements")
+    parser.add_argument("--sources", default=env("CAMERA_SOURCES", "0"),
+                        help='comma-separated camera indices, files or stream URLs, e.g. "0,1" or "0,video.mp4"')
+    parser.add_argument("--model", dest="model_weights", default=env("MODEL_WEIGHTS", defaults.model_weights))
+    parser.add_argument("--backend", dest="model_backend", default=env("MODEL_BACKEND", defaults.model_backend),
+                        choices=["torch", "onnx", "openvino"])
+    parser.add_argument("--imgsz", type=int, default=int(env("MODEL_IMGSZ", defaults.imgsz)))
+    parser.add_argument("--int8", action="store_true", default=_env_flag("MODEL_INT8"))
+    parser.add_argument("--calibration", default=env("MODEL_CALIBRATION"))
+    parser.add_argument("--model-cache-dir", default=env("MODEL_CACHE_DIR"))
+    parser.add_argument("--min-imgsz", type=int, default=defaults.min_imgsz,
+                        help="smallest full-frame inference size chosen for large, close objects")
+    parser.add_argument("--full-scan-every", type=int, default=int(env("FULL_SCAN_EVERY", defaults.full_scan_every)),
+                        help="every N-th inference scans the full frame at --imgsz; in between only crops "
+                             "around tracks are detected, so new objects elsewhere are found later (default 1 = no crops)")
+    parser.add_argument("--max-latency", dest="max_inference_latency", type=float, default=None,
+                        help="target seconds per model call; lowers the input size under load")
+    parser.add_argument("--roi", default=env("DETECTION_ROI"),
+                        help='fixed regions of interest as frame fractions, e.g. "0.25,0.3,0.75,1"; cropped '
+                             'between full scans, so it requires --full-scan-every > 1')
+    parser.add_argument("--conf", dest="conf_threshold", type=float, default=defaults.conf_threshold)
+    parser.add_argument("--every-n", dest="detect_every_n", type=int,
+                        default=int(env("DETECT_EVERY_N", defaults.detect_every_n)))
+    parser.add_argument("--motion-threshold", type=float, default=defaults.motion_threshold)
+    parser.add_argument("--duty", dest="inference_duty", type=float, default=defaults.inference_duty)
+    parser.add_argument("--no-audio", dest="audio", action="store_false", default=not _env_flag("NO_AUDIO"))
+    parser.add_argument("--tts-backend", default=env("TTS_BACKEND", defaults.tts_backend),
+                        choices=["gtts", "pyttsx3"])
+    parser.add_argument("--tts-cache-dir", default=env("TTS_CACHE_DIR", defaults.tts_cache_dir))
+    parser.add_argument("--prewarm-tts", action="store_true", default=_env_flag("PREWARM_TTS"))
+    parser.add_argument("--no-display", dest="display", action="store_false", default=not _env_flag("NO_DISPLAY"))
+    parser.add_argument("--stream-port", type=int, default=int(env("STREAM_PORT", defaults.stream_port)),
+                        help="serve annotated frames as MJPEG on this port (0 = off)")
+    parser.add_argument("--stream-quality", type=int, default=defaults.stream_quality)
+    parser.add_argument("--stream-max-fps", type=float, default=defaults.stream_max_fps)
+    parser.add_argument("--metrics-port", type=int, default=int(env("METRICS_PORT", defaults.metrics_port)))
+    parser.add_argument("--metrics-log-interval", type=float,
+                        default=float(env("METRICS_LOG_INTERVAL", defaults.metrics_log_interval)))
+    return parser
+
+
+def config_from_args(argv=None):
+    """Собирает DetectorConfig из аргументов командной строки и переменных окружения"""
+    args = build_parser().parse_args(argv)
+    values = vars(args)
+    values["sources"] = parse_sources(values["sources"])
+    try:
+        parse_regions(values["roi"])
+    except ValueError as e:
+        build_parser().error(str(e))
+    # Области интереса работают только как кропы между полными сканами
+    if values["roi"] and values["full_scan_every"] <= 1:
+        build_parser().error("--roi requires --full-scan-every > 1 (regions are only cropped between full scans)")
+    return DetectorConfig(**values)
@@ -0,0 +1,148 @@
+import time
+
+import cv2
+import numpy as np
+
+from .audio import PRIORITY_NORMAL, PRIORITY_URGENT
+from .metrics import METRICS
+from .postprocess import extract_detections, make_detections, detection_boxes, label_table
+
+
+class Announcer:
+    """Передаёт новые объекты в звуковой движок; близкие объекты — со срочным приоритетом.
+
+    При нескольких источниках в объявлении называется камера (spoken_name),
+    и объекты разных камер не сливаются в одну фразу. Без engine объявления
+    только считаются (headless-режим).
+    """
+
+    def __init__(self, engine=None, urgent_distance=1.0):
+        self.engine = engine
+        self.urgent_distance = urgent_distance
+        self.announced = 0
+
+    def announce(self, source, label, distance):
+        """Ставит обнаруженный объект в очередь озвучивания"""
+        self.announced += 1
+        METRICS.inc("announcements")
+        if self.engine is not None:
+            priority = PRIORITY_URGENT if distance < self.urgent_distance else PRIORITY_NORMAL
+            self.engine.submit(label, distance, priority, source.spoken_name)
+
+
+class ObjectDetector:
+    """Детекция, трекинг и озвучивание для набора источников.
+
+    Общая логика для живого приложения и headless-бенчмарка: на вход пакет
+    кадров разных источников, на выход пары (кадр, детекции).
+    """
+
+    def __init__(self, model, sources, scheduler, announcer, known_width=0.5, focal_length=500,
+                 conf_threshold=0.5, predict_kwargs=None, planner=None):
+        self.model = model
+        self.sources = sources
+        self.scheduler = scheduler
+        self.announcer = announcer
+        self.known_width = known_width
+        self.focal_length = focal_length
+        self.conf_threshold = conf_threshold
+        self.predict_kwargs = predict_kwargs or {}
+        # Планировщик размера входа и областей интереса; None — всегда полный кадр
+        self.planner = planner
+        # Таблица имён классов для векторного поиска подписей
+        self.labels = label_table(model.names)
+        self.inference_calls = 0
+
+    def track_detections(self, source, packet, detections):
+        """Обновляет трекер источника и озвучивает новые объекты"""
+        # Отслеживаем только уверенные детекции; озвучиваем только новые объекты
+        confident = detections[detections["conf"] > self.conf_threshold]
+        _, is_new = source.tracker.update(detection_boxes(confident), confident["cls"],
+                                          packet.captured_at, confident["conf"])
+        for det in confident[is_new]:
+            self.announcer.announce(source, self.labels[det["cls"]], float(det["distance"]))
+
+    def extrapolate_detections(self, source, packet):
+        """Рамки между детекциями: сдвигаем треки по их оценке скорости"""
+        _, boxes, classes, scores = source.tracker.predict(packet.captured_at)
+        return make_detections(boxes, scores, classes, self.known_width, self.focal_length)
+
+    def process(self, packets):
+        """Батч YOLO на кадры, которым нужна детекция; остальные экстраполируются"""
+        # Планировщик пропускает статичные кадры и держит инференс в рамках бюджета
+        to_detect = [p for p in packets
+                     if self.scheduler.should_detect(p.source, p.image, p.captured_at)]
+
+        outputs = {}
+        if to_detect:
+            detected = self._detect(to_detect)
+            for packet in to_detect:
+                with METRICS.timer("tracking"):
+                    self.track_detections(self.sources[packet.source], packet, detected[packet.source])
+                outputs[packet.source] = (packet, detected[packet.source])
+
+        for packet in packets:
+            if packet.source not in outputs:
+                source = self.sources[packet.source]
+                with METRICS.timer("extrapolate"):
+                    outputs[packet.source] = (packet, self.extrapolate_detections(source, packet))
+                METRICS.inc("frames_extrapolated")
+        return list(outputs.values())
+
+    def _plan(self, packet):
+        if self.planner is None:
+            return [(None, None)]
+        tracker = self.sources[packet.source].tracker
+        return self.planner.plan(packet.source, packet.image.shape, tracker.live_boxes(packet.captured_at))
+
+    def _detect(self, packets):
+        """Инференс по плану: кадры и кропы с одинаковым размером входа идут одним батчем"""
+        groups = {}  # imgsz -> [(packet, region)]
+        for packet in packets:
+            for imgsz, region in self._plan(packet):
+                groups.setdefault(imgsz, []).append((packet, region))
+
+        parts = {packet.source: [] for packet in packets}
+        total = 0.0
+        for imgsz, tasks in groups.items():
+            images = [packet.image if region is None
+                      else np.ascontiguousarray(packet.image[region[1]:region[3], region[0]:region[2]])
+                      for packet, region in tasks]
+            kwargs = dict(self.predict_kwargs)
+            if imgsz is not None:
+                kwargs["imgsz"] = imgsz
+            # Одна модель обслуживает все камеры: кадры идут в модель одним батчем
+            started = time.perf_counter()
+            results = list(self.model(images, stream=True, verbose=False, **kwargs))
+            elapsed = time.perf_counter() - started
+            total += elapsed
+            METRICS.inc("inference_calls")
+            self.inference_calls += 1
+            if imgsz is not None:
+                self.planner.record(imgsz, len(images), elapsed)
+            crops = sum(region is not None for _, region in tasks)
+            METRICS.inc("roi_crops", crops)
+            METRICS.inc("full_frames", len(tasks) - crops)
+
+            for (packet, region), result in zip(tasks, results):
+                # Переносим предсказания кадра в NumPy одним блоком
+                with METRICS.timer("postprocess"):
+                    detections = extract_detections([result], self.known_width, self.focal_length)
+                    if region is not None:
+                        # Координаты кропа -> координаты кадра; расстояние зависит только от ширины
+                        for axis, offset in zip(("x1", "y1", "x2", "y2"), region[:2] * 2):
+                            detections[axis] += offset
+                parts[packet.source].append(detections)
+
+        self.scheduler.record_inference(total, max(packet.captured_at for packet in packets))
+        METRICS.observe("model", total)
+        METRICS.inc("frames_detected", len(packets))
+        return {source: np.concatenate(found) for source, found in parts.items()}
+
+    def draw(self, frame, detections):
+        """Рисует рамки и подписи найденных объектов"""
+        for det, label in zip(detections.tolist(), self.labels[detections["cls"]]):
+            x1, y1, x2, y2, conf, _, distance = det
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(frame, f"{label} {conf:.2f} {distance:.2f}m", (x1, y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
@@ -0,0 +1,183 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def percentiles(values, quantiles=(0.50, 0.95, 0.99), scale=1.0, digits=6):
+    """Перцентили методом ближайшего ранга и максимум: {"p50": ..., "max": ...}.
+
+    Один метод для гистограмм и отчётов бенчмарков, чтобы их числа были
+    сравнимы (копия — в sign_processing/metrics.py); scale переводит единицы
+    (1000 — секунды в мс). Для пустого values все значения None.
+    """
+    names = [f"p{round(q * 100)}" for q in quantiles] + ["max"]
+    if not len(values):
+        return dict.fromkeys(names)
+    values = sorted(values)
+    picks = [values[max(0, math.ceil(round(q * len(values), 9)) - 1)] for q in quantiles] + [values[-1]]
+    return {name: round(value * scale, digits) for name, value in zip(names, picks)}
+
+
+class RollingHistogram:
+    """Последние window значений плюс накопленные count/sum.
+
+    Запись — только append в deque; перцентили считаются при чтении,
+    поэтому горячий путь почти ничего не стоит.
+    """
+
+    def __init__(self, window=1024):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self):
+        if not self.samples:
+            return {"count": self.count, "sum": self.total}
+        return {"count": self.count, "sum": round(self.total, 6), **percentiles(self.samples)}
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """Счётчики, гистограммы времён стадий и вычисляемые показатели детектора"""
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}  # name -> функция без аргументов, вызывается при чтении
+        self.started = time.time()
+
+    def timer(self, name):
+        """Контекстный менеджер: время блока попадает в гистограмму name (секунды)"""
+        return _Timer(self, name)
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = RollingHistogram(self.window)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def gauge(self, name, func):
+        """Регистрирует показатель, значение которого берётся из func() при чтении"""
+        with self._lock:
+            self._gauges[name] = func
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {name: h.summary() for name, h in self._histograms.items()}
+            gauges = dict(self._gauges)
+        values = {}
+        for name, func in gauges.items():
+            try:
+                values[name] = func()
+            except Exception:
+                values[name] = None
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "counters": counters,
+            "gauges": values,
+            "timings": histograms,
+        }
+
+    def log_line(self):
+        """Короткая строка для периодического лога: p50/p95 стадий в мс и показатели"""
+        snap = self.snapshot()
+        parts = []
+        for name, summary in sorted(snap["timings"].items()):
+            if "p50" in summary:
+                parts.append(f"{name}={summary['p50'] * 1000:.1f}/{summary['p95'] * 1000:.1f}ms")
+        parts.extend(f"{name}={value}" for name, value in sorted(snap["counters"].items()))
+        parts.extend(f"{name}={value}" for name, value in sorted(snap["gauges"].items()))
+        return "Metrics: " + " ".join(parts)
+
+    def to_prometheus(self):
+        snap = self.snapshot()
+        lines = []
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"detector_{name}_total {value}")
+        for name, value in sorted(snap["gauges"].items()):
+            if value is not None:
+                lines.append(f"detector_{name} {value}")
+        for name, summary in sorted(snap["timings"].items()):
+            for q in ("p50", "p95", "p99"):
+                if q in summary:
+                    quantile = int(q[1:]) / 100
+                    lines.append(f'detector_{name}_seconds{{quantile="{quantile}"}} {summary[q]}')
+            lines.append(f"detector_{name}_seconds_count {summary['count']}")
+            lines.append(f"detector_{name}_seconds_sum {summary['sum']}")
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр процесса
+METRICS = Metrics()
+
+
+def start_metrics_server(metrics, host="127.0.0.1", port=9100):
+    """Локальный HTTP-эндпоинт: /metrics (Prometheus text) и /metrics.json"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = metrics.to_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body = json.dumps(metrics.snapshot()).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def start_metrics_logger(metrics, interval, stop_event):
+    """Печатает строку с метриками каждые interval секунд до stop_event"""
+
+    def run():
+        while not stop_event.wait(interval):
+            print(metrics.log_line())
+
+    thread = threading.Thread(target=run, name="metrics-log", daemon=True)
+    thread.start()
+    return thread
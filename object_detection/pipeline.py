@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import namedtuple
+
+from .metrics import METRICS
+
+# Кадр, проходящий через конвейер: источник, номер, момент захвата и само изображение
+FramePacket = namedtuple("FramePacket", ["source", "index", "captured_at", "image"])
+
+
+class LatestSlots:
+    """Хранит только последний элемент от каждого источника.
+
+    get() забирает сразу все накопившиеся элементы — так инференс получает
+    пакет из свежих кадров всех камер. Очередь закрывается, когда close()
+    вызовут все producers источников.
+    """
+
+    def __init__(self, producers=1, key=lambda item: item.source):
+        self._slots = {}
+        self._key = key
+        self._cond = threading.Condition()
+        self._open_producers = producers
+        self.dropped = 0
+
+    @property
+    def closed(self):
+        return self._open_producers <= 0
+
+    def put(self, item):
+        with self._cond:
+            key = self._key(item)
+            if key in self._slots:
+                self.dropped += 1
+            self._slots[key] = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Возвращает список последних элементов по источникам или None"""
+        with self._cond:
+            if not self._slots and not self.closed:
+                self._cond.wait(timeout)
+            if not self._slots:
+                return None
+            items = list(self._slots.values())
+            self._slots.clear()
+            return items
+
+    def close(self):
+        with self._cond:
+            self._open_producers -= 1
+            self._cond.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    """Читает кадры с камеры и кладёт в очередь только самые свежие.
+
+    Если задан fps (файл вместо потока), чтение идёт в темпе записи, а не
+    с максимальной скоростью декодирования: иначе «поток» проматывается
+    вперёд, а большинство кадров выбрасывается в очереди.
+    """
+
+    def __init__(self, cap, out_queue, stop_event, source=0, fps=None):
+        super().__init__(name=f"capture-{source}", daemon=True)
+        self.cap = cap
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.source = source
+        self.frame_interval = 1.0 / fps if fps else 0.0
+
+    def run(self):
+        index = 0
+        next_due = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                if self.frame_interval:
+                    delay = next_due - time.monotonic()
+                    if delay > 0 and self.stop_event.wait(delay):
+                        break
+                    # Отставший источник не догоняет рывком: отсчёт идёт от текущего момента
+                    next_due = max(next_due, time.monotonic()) + self.frame_interval
+                with METRICS.timer("capture"):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    print(f"Error: Could not get frame from source {self.source}")
+                    break
+                self.out_queue.put(FramePacket(self.source, index, time.monotonic(), frame))
+                METRICS.inc("frames_captured")
+                index += 1
+        finally:
+            self.out_queue.close()
+
+
+class Worker(threading.Thread):
+    """Стадия конвейера: берёт элемент из входной очереди, обрабатывает и передаёт дальше.
+
+    func возвращает список результатов, каждый из них кладётся в выходную очередь.
+    """
+
+    def __init__(self, name, func, in_queue, out_queue, stop_event, poll_interval=0.1):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.poll_interval = poll_interval
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                item = self.in_queue.get(timeout=self.poll_interval)
+                if item is None:
+                    if self.in_queue.closed:
+                        break
+                    continue
+                try:
+                    with METRICS.timer(self.name):
+                        results = self.func(item)
+                except Exception as e:
+                    METRICS.inc(f"{self.name}_errors")
+                    print(f"Error in {self.name} stage: {e}")
+                    continue
+                for result in results:
+                    self.out_queue.put(result)
+        finally:
+            self.out_queue.close()
@@ -0,0 +1,63 @@
+import numpy as np
+
+# Компактное представление детекций кадра: одна запись на рамку
+DETECTION_DTYPE = np.dtype([
+    ("x1", np.int32), ("y1", np.int32), ("x2", np.int32), ("y2", np.int32),
+    ("conf", np.float32),
+    ("cls", np.int32),
+    ("distance", np.float32),
+])
+
+
+def label_table(names):
+    """Массив имён классов для векторного поиска подписи по индексу класса"""
+    if isinstance(names, dict):
+        table = np.empty(max(names) + 1 if names else 0, dtype=object)
+        for i, name in names.items():
+            table[i] = name
+        return table
+    return np.array(list(names), dtype=object)
+
+
+def extract_detections(results, known_width, focal_length, min_conf=0.0):
+    """Переводит результаты YOLO в структурированный массив одним переносом на кадр.
+
+    Вместо обращения к box.xyxy[0] / box.conf[0] / box.cls[0] для каждой рамки
+    тензоры всего кадра копируются в NumPy сразу, а фильтр по уверенности и
+    расчёт расстояния выполняются над массивами.
+    """
+    parts = []
+    for r in results:
+        boxes = r.boxes
+        if boxes is None or len(boxes) == 0:
+            continue
+        parts.append((boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()))
+
+    if not parts:
+        return np.empty(0, dtype=DETECTION_DTYPE)
+
+    xyxy = np.concatenate([p[0] for p in parts])
+    conf = np.concatenate([p[1] for p in parts])
+    cls = np.concatenate([p[2] for p in parts])
+
+    keep = conf >= min_conf
+    return make_detections(xyxy[keep], conf[keep], cls[keep], known_width, focal_length)
+
+
+def make_detections(xyxy, conf, cls, known_width, focal_length):
+    """Собирает структурированный массив детекций из рамок, уверенностей и классов"""
+    xyxy = np.asarray(xyxy).reshape(-1, 4).astype(np.int32, copy=False)
+    detections = np.empty(len(xyxy), dtype=DETECTION_DTYPE)
+    detections["x1"], detections["y1"] = xyxy[:, 0], xyxy[:, 1]
+    detections["x2"], detections["y2"] = xyxy[:, 2], xyxy[:, 3]
+    detections["conf"] = conf
+    detections["cls"] = cls
+    pixel_width = np.maximum(xyxy[:, 2] - xyxy[:, 0], 1)
+    detections["distance"] = (known_width * focal_length) / pixel_width
+    return detections
+
+
+def detection_boxes(detections):
+    """Рамки детекций в виде массива (N, 4)"""
+    return np.stack([detections["x1"], detections["y1"],
+                     detections["x2"], detections["y2"]], axis=1)
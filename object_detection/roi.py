@@ -0,0 +1,129 @@
+import numpy as np
+
+STRIDE = 32  # Размер входа YOLO должен быть кратен шагу сети
+
+
+def round_size(size, min_size, max_size):
+    """Округляет размер входа вверх до кратного STRIDE в пределах [min_size, max_size]"""
+    size = int(np.ceil(size / STRIDE)) * STRIDE
+    return int(min(max(size, min_size), max_size))
+
+
+def parse_regions(spec):
+    """Разбирает "x1,y1,x2,y2;..." в доли кадра (0..1) для постоянных областей интереса"""
+    regions = []
+    for part in (spec or "").split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        values = [float(v) for v in part.split(",")]
+        if len(values) != 4 or not all(0 <= v <= 1 for v in values) or values[0] >= values[2] or values[1] >= values[3]:
+            raise ValueError(f"Invalid region of interest: {part!r} (expected x1,y1,x2,y2 as frame fractions)")
+        regions.append(values)
+    return np.asarray(regions, dtype=np.float32).reshape(-1, 4)
+
+
+def merge_regions(regions):
+    """Объединяет пересекающиеся прямоугольники, чтобы кропы не детектировали одно и то же дважды"""
+    regions = [list(r) for r in regions]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                a, b = regions[i], regions[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    regions[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del regions[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return regions
+
+
+class InferencePlanner:
+    """Выбирает для кадра размер входа модели и области, на которых её запускать.
+
+    Вместо полного кадра на фиксированном разрешении:
+    - каждый full_scan_every-й инференс источника — полный кадр на max_size,
+      чтобы не терять мелкие далёкие объекты (full_scan_every=1 отключает кропы);
+    - между ними, если треки (и заданные regions, которые без полных
+      сканов не используются) занимают не больше
+      max_roi_area кадра, модель запускается только на кропах вокруг них
+      почти в исходном разрешении;
+    - иначе полный кадр на минимальном размере, при котором самый мелкий
+      трек остаётся не меньше min_object_px пикселей, но не дороже
+      max_latency по измеренной стоимости модели.
+    План — список (imgsz, region), где region — (x1, y1, x2, y2) в пикселях
+    или None для полного кадра.
+    """
+
+    def __init__(self, max_size=640, min_size=320, full_scan_every=10, min_object_px=32, max_latency=None,
+                 roi_padding=0.5, max_roi_area=0.5, max_rois=4, regions=None, smoothing=0.2):
+        self.max_size = max_size
+        self.min_size = min(min_size, max_size)
+        self.full_scan_every = full_scan_every
+        self.min_object_px = min_object_px
+        self.max_latency = max_latency
+        self.roi_padding = roi_padding
+        self.max_roi_area = max_roi_area
+        self.max_rois = max_rois
+        self.regions = regions if regions is not None else np.empty((0, 4), dtype=np.float32)
+        self.smoothing = smoothing
+        self.pixel_cost = 0.0  # сглаженное время модели на пиксель входа, с
+        self._since_scan = {}  # source -> инференсов с последнего полного скана
+
+    def budget_size(self, images=1):
+        """Наибольший размер входа, укладывающийся в max_latency при текущей стоимости модели"""
+        if self.max_latency is None or self.pixel_cost == 0.0:
+            return self.max_size
+        size = np.sqrt(self.max_latency / (self.pixel_cost * images))
+        return int(min(max(size // STRIDE * STRIDE, self.min_size), self.max_size))
+
+    def record(self, imgsz, images, seconds):
+        """Учитывает время вызова модели: стоимость считается пропорциональной площади входа"""
+        cost = seconds / (imgsz * imgsz * max(images, 1))
+        if self.pixel_cost == 0.0:
+            self.pixel_cost = cost
+        else:
+            a = self.smoothing
+            self.pixel_cost = a * cost + (1 - a) * self.pixel_cost
+
+    def _track_regions(self, boxes, width, height):
+        """Расширенные на roi_padding рамки треков и заданные области, в пикселях кадра"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        pad = np.maximum(boxes[:, 2:] - boxes[:, :2], 1) * self.roi_padding
+        padded = np.concatenate([boxes[:, :2] - pad, boxes[:, 2:] + pad], axis=1)
+        configured = self.regions * np.array([width, height, width, height], dtype=np.float32)
+        regions = np.concatenate([padded, configured])
+        regions = np.clip(regions, 0, [width, height, width, height]).round().astype(int)
+        regions = regions[(regions[:, 2] > regions[:, 0]) & (regions[:, 3] > regions[:, 1])]
+        return merge_regions(regions.tolist())
+
+    def plan(self, source, frame_shape, track_boxes):
+        """План инференса для кадра источника по рамкам его активных треков"""
+        height, width = frame_shape[:2]
+        since = self._since_scan.get(source)
+        if since is None or 1 < self.full_scan_every <= since + 1:
+            self._since_scan[source] = 0
+            return [(self.max_size, None)]
+        self._since_scan[source] = since + 1
+
+        track_boxes = np.asarray(track_boxes, dtype=np.float32).reshape(-1, 4)
+        if self.full_scan_every > 1 and (len(track_boxes) or len(self.regions)):
+            regions = self._track_regions(track_boxes, width, height)
+            area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+            if regions and len(regions) <= self.max_rois and area <= self.max_roi_area * width * height:
+                # Кропы идут почти в исходном разрешении: мелкие объекты не теряются при сжатии кадра
+                side = max(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in regions)
+                imgsz = min(round_size(side, self.min_size // 2, self.max_size), self.budget_size(len(regions)))
+                return [(imgsz, tuple(region)) for region in regions]
+
+        imgsz = self.budget_size()
+        if len(track_boxes):
+            # Самый мелкий трек после сжатия кадра должен остаться не меньше min_object_px
+            sides = np.minimum(track_boxes[:, 2] - track_boxes[:, 0], track_boxes[:, 3] - track_boxes[:, 1])
+            needed = self.min_object_px * max(width, height) / max(float(sides.min()), 1.0)
+            imgsz = min(imgsz, round_size(needed, self.min_size, self.max_size))
+        return [(imgsz, None)]
@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+
+
+class DetectionScheduler:
+    """Решает, на каких кадрах запускать полный инференс YOLO.
+
+    Детекция запускается, если с последнего инференса кадр заметно изменился
+    (разница уменьшенных серых кадров) или прошло every_n кадров. Поверх этого
+    действует бюджет: инференс не чаще, чем позволяет измеренное время модели
+    при доле загрузки max_duty, поэтому на слабом железе частота детекции
+    снижается сама, а не отстаёт от реального времени. Бюджет общий для
+    всех источников: одна модель обслуживает все камеры, и кадры, прошедшие
+    проверку в одном цикле, идут одним вызовом. max_duty=None отключает бюджет.
+    """
+
+    def __init__(self, every_n=5, motion_threshold=6.0, max_duty=0.8, motion_size=(64, 48), smoothing=0.2):
+        self.every_n = every_n
+        self.motion_threshold = motion_threshold
+        self.max_duty = max_duty
+        self.motion_size = motion_size
+        self.smoothing = smoothing
+        self.inference_time = 0.0  # сглаженное время одного вызова модели, с
+        self._last_inference = None  # время кадров последнего вызова модели
+        self._state = {}  # source -> [эталонный кадр, кадров с детекции]
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, self.motion_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def min_interval(self):
+        """Минимальный интервал между вызовами модели по бюджету"""
+        if self.max_duty is None:
+            return 0.0
+        return self.inference_time / self.max_duty
+
+    def should_detect(self, source, frame, now):
+        """True, если для кадра нужен полный инференс"""
+        thumb = self._thumbnail(frame)
+        state = self._state.get(source)
+        if state is None:
+            self._state[source] = [thumb, 0]
+            return True
+
+        reference, frames_since = state
+        state[1] = frames_since + 1
+        if self._last_inference is not None and now - self._last_inference < self.min_interval():
+            return False
+
+        motion = float(np.mean(cv2.absdiff(thumb, reference)))
+        if motion < self.motion_threshold and state[1] < self.every_n:
+            return False
+
+        self._state[source] = [thumb, 0]
+        return True
+
+    def record_inference(self, seconds, now=None):
+        """Учитывает измеренное время вызова модели для адаптации частоты.
+
+        now — время кадров, на которых был вызов; от него отсчитывается
+        интервал до следующего вызова по любому источнику.
+        """
+        if now is not None:
+            self._last_inference = now
+        if self.inference_time == 0.0:
+            self.inference_time = seconds
+        else:
+            a = self.smoothing
+            self.inference_time = a * seconds + (1 - a) * self.inference_time
@@ -0,0 +1,58 @@
+import cv2
+
+
+def parse_sources(spec):
+    """Разбирает список источников через запятую: индексы камер, файлы или URL потоков"""
+    sources = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        sources.append(int(part) if part.isdigit() else part)
+    return sources
+
+
+class CameraSource:
+    """Источник видео со своим трекером и окном вывода"""
+
+    def __init__(self, index, spec):
+        self.index = index
+        self.spec = spec
+        self.name = str(spec)
+        self.cap = None
+        self.tracker = None  # назначается приложением
+        self.window_name = "YOLOv8 - Object Detection"
+        self.spoken_name = None  # как источник называется в озвучке; None — не называется
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.spec)
+        return self.cap.isOpened()
+
+    def playback_fps(self):
+        """Частота, с которой читать кадры: у файла — его FPS, у камеры None (её темп задаёт устройство)"""
+        if isinstance(self.spec, int) or self.cap is None:
+            return None
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        return fps if fps and fps > 0 else None
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+def open_sources(specs):
+    """Открывает все источники; при ошибке уже открытые освобождаются"""
+    sources = []
+    for index, spec in enumerate(specs):
+        source = CameraSource(index, spec)
+        if not source.open():
+            for opened in sources:
+                opened.release()
+            raise RuntimeError(f"Could not open video source {spec!r}")
+        sources.append(source)
+    if len(sources) > 1:
+        for source in sources:
+            source.window_name = f"YOLOv8 - Object Detection [{source.name}]"
+            # Путь к файлу или URL не произносятся: камеры озвучиваются по номеру
+            source.spoken_name = f"camera {source.index + 1}"
+    return sources
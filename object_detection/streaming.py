@@ -0,0 +1,201 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from .metrics import METRICS
+
+BOUNDARY = "frame"
+
+
+class FrameBroadcaster:
+    """Хранит последний закодированный кадр; каждый зритель забирает его сам.
+
+    Кадр кодируется в JPEG один раз в отдельном потоке, а всем клиентам
+    отдаётся один и тот же буфер. Медленный клиент просто пропускает
+    промежуточные кадры и никогда не блокирует детекцию. Пока зрителей
+    нет, publish() ничего не делает.
+    """
+
+    def __init__(self, to_json, quality=80, max_fps=15):
+        self.to_json = to_json  # (packet, detections) -> str
+        self.quality = quality
+        self.max_fps = max_fps
+        self._cond = threading.Condition()
+        self._pending = None  # последний кадр, ещё не закодированный
+        self._jpeg = None
+        self._detections = None
+        self._version = 0
+        self._closed = False
+        self.video_viewers = 0
+        self.json_viewers = 0
+
+    def publish(self, packet, detections):
+        """Передаёт кадр кодировщику; вызывается из цикла отрисовки и не блокирует"""
+        if not self.video_viewers and not self.json_viewers:
+            return
+        with self._cond:
+            if self._pending is not None:
+                METRICS.inc("stream_encode_dropped")
+            self._pending = (packet, detections)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def run_encoder(self):
+        """Цикл кодирования; выполняется в отдельном потоке"""
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                packet, detections = self._pending
+                self._pending = None
+
+            jpeg = detections_json = None
+            if self.video_viewers:
+                with METRICS.timer("jpeg_encode"):
+                    ok, buffer = cv2.imencode(".jpg", packet.image, params)
+                if ok:
+                    jpeg = buffer.tobytes()
+            if self.json_viewers:
+                detections_json = self.to_json(packet, detections)
+            with self._cond:
+                self._jpeg = jpeg if jpeg is not None else self._jpeg
+                self._detections = detections_json if detections_json is not None else self._detections
+                self._version += 1
+                self._cond.notify_all()
+
+    def wait_next(self, last_version, timeout=1.0):
+        """Ждёт кадр новее last_version; возвращает (version, jpeg, detections) или None после close()"""
+        with self._cond:
+            if self._version == last_version and not self._closed:
+                self._cond.wait(timeout)
+            if self._closed:
+                return None
+            return self._version, self._jpeg, self._detections
+
+    def add_viewer(self, video=0, data=0):
+        with self._cond:
+            self.video_viewers += video
+            self.json_viewers += data
+
+
+def detections_to_json(source_name, packet, detections, labels):
+    """Компактное JSON-представление детекций кадра"""
+    return json.dumps({
+        "source": source_name,
+        "frame": packet.index,
+        "objects": [
+            {"label": str(label), "box": [x1, y1, x2, y2], "conf": round(conf, 3), "distance": round(distance, 2)}
+            for (x1, y1, x2, y2, conf, _, distance), label
+            in zip(detections.tolist(), labels[detections["cls"]])
+        ],
+    })
+
+
+def _make_handler(broadcasters):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _broadcaster(self):
+            # /stream/<n>.mjpg и /detections/<n> выбирают источник, без номера — первый
+            parts = self.path.split("?")[0].strip("/").split("/")
+            index = 0
+            if len(parts) > 1:
+                try:
+                    index = int(parts[1].split(".")[0])
+                except ValueError:
+                    return None
+            return broadcasters[index] if 0 <= index < len(broadcasters) else None
+
+        def do_GET(self):
+            route = self.path.split("?")[0].strip("/").split("/")[0]
+            broadcaster = self._broadcaster()
+            if broadcaster is None:
+                self.send_error(404)
+            elif route in ("stream", "stream.mjpg"):
+                self._stream_mjpeg(broadcaster)
+            elif route == "detections":
+                self._stream_detections(broadcaster)
+            else:
+                self.send_error(404)
+
+        def _stream_mjpeg(self, broadcaster):
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+            self.send_header("Cache-Control", "no-cache, private")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            min_interval = 1.0 / broadcaster.max_fps
+            broadcaster.add_viewer(video=1)
+            version = 0
+            try:
+                while True:
+                    started = time.monotonic()
+                    latest = broadcaster.wait_next(version)
+                    if latest is None:
+                        break
+                    version, jpeg, _ = latest
+                    if jpeg is None:
+                        continue
+                    # Запись идёт в потоке клиента: медленный клиент тормозит только себя
+                    self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                     f"Content-Length: {len(jpeg)}\r\n\r\n".encode("ascii"))
+                    self.wfile.write(jpeg)
+                    self.wfile.write(b"\r\n")
+                    METRICS.inc("stream_frames_sent")
+                    # Частота подстраивается под клиента, но не выше max_fps
+                    spent = time.monotonic() - started
+                    if spent < min_interval:
+                        time.sleep(min_interval - spent)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                broadcaster.add_viewer(video=-1)
+
+        def _stream_detections(self, broadcaster):
+            """Запасной вариант без видео: поток детекций в формате server-sent events"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            broadcaster.add_viewer(data=1)
+            version = 0
+            try:
+                while True:
+                    latest = broadcaster.wait_next(version)
+                    if latest is None:
+                        break
+                    version, _, detections_json = latest
+                    if detections_json is None:
+                        continue
+                    self.wfile.write(f"data: {detections_json}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                broadcaster.add_viewer(data=-1)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_stream_server(broadcasters, host="0.0.0.0", port=8080):
+    """HTTP-сервер: /stream/<n>.mjpg (MJPEG) и /detections/<n> (JSON через SSE)"""
+    server = ThreadingHTTPServer((host, port), _make_handler(broadcasters))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stream-http", daemon=True).start()
+    for i, broadcaster in enumerate(broadcasters):
+        threading.Thread(target=broadcaster.run_encoder, name=f"jpeg-encode-{i}", daemon=True).start()
+    return server
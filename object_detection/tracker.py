@@ -0,0 +1,151 @@
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """Матрица IoU между рамками a (N, 4) и b (M, 4) в формате x1, y1, x2, y2"""
+    a = a[:, None, :]
+    b = b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def centroid_distance(a, b):
+    """Расстояние между центрами рамок, нормированное на диагональ рамок из a"""
+    ca = (a[:, None, :2] + a[:, None, 2:]) / 2
+    cb = (b[None, :, :2] + b[None, :, 2:]) / 2
+    diag = np.hypot(a[:, 2] - a[:, 0], a[:, 3] - a[:, 1])[:, None]
+    return np.linalg.norm(ca - cb, axis=2) / np.maximum(diag, 1e-9)
+
+
+class IoUTracker:
+    """Трекер объектов между кадрами по IoU и расстоянию между центрами.
+
+    Состояние хранится в компактных массивах NumPy: по одной строке на трек.
+    Трек живёт, пока объект не пропадает дольше timeout секунд, поэтому
+    дрожание рамки или короткое перекрытие не создают «новый» объект.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=0.5, timeout=2.0, velocity_smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.timeout = timeout
+        self.velocity_smoothing = velocity_smoothing
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.velocities = np.empty((0, 4), dtype=np.float32)  # пикселей в секунду
+        self.classes = np.empty(0, dtype=np.int32)
+        self.scores = np.empty(0, dtype=np.float32)
+        self.first_seen = np.empty(0, dtype=np.float64)
+        self.last_seen = np.empty(0, dtype=np.float64)
+        self.hits = np.empty(0, dtype=np.int32)
+        self.last_update = None
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    def ages(self, now):
+        """Возраст каждого трека в секундах"""
+        return now - self.first_seen
+
+    def predict(self, now):
+        """Экстраполирует рамки треков из последней детекции на момент now.
+
+        Возвращает (ids, boxes, classes, scores) только для треков, найденных
+        при последнем вызове update().
+        """
+        if self.last_update is None:
+            visible = np.zeros(len(self.ids), dtype=bool)
+        else:
+            visible = self.last_seen == self.last_update
+        dt = (now - self.last_seen[visible]).astype(np.float32)[:, None]
+        boxes = self.boxes[visible] + self.velocities[visible] * dt
+        return self.ids[visible], boxes, self.classes[visible], self.scores[visible]
+
+    def live_boxes(self, now):
+        """Экстраполированные на момент now рамки всех живых треков, включая пропущенные детекцией"""
+        dt = (now - self.last_seen).astype(np.float32)[:, None]
+        return self.boxes + self.velocities * dt
+
+    def update(self, boxes, classes, now, scores=None):
+        """Сопоставляет детекции текущего кадра с треками.
+
+        Возвращает (track_ids, is_new): id трека для каждой детекции и маску
+        детекций, для которых был создан новый трек.
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        classes = np.asarray(classes, dtype=np.int32).reshape(-1)
+        n_det = len(boxes)
+        if scores is None:
+            scores = np.ones(n_det, dtype=np.float32)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        det_track = np.full(n_det, -1, dtype=np.int64)
+
+        # Треки, которые не видели дольше timeout, удаляются до сопоставления:
+        # объект, вернувшийся после долгого отсутствия, считается новым
+        stale = (now - self.last_seen) > self.timeout
+        if stale.any():
+            self._select(~stale)
+
+        if len(self.ids) and n_det:
+            iou = iou_matrix(self.boxes, boxes)
+            dist = centroid_distance(self.boxes, boxes)
+            valid = (self.classes[:, None] == classes[None, :]) & (
+                (iou >= self.iou_threshold) | (dist <= self.max_centroid_distance))
+            # Жадное сопоставление: сначала пары с наибольшим IoU, затем ближайшие
+            score = np.where(valid, iou - 0.01 * dist, -np.inf)
+            order = np.argsort(score, axis=None)[::-1]
+            track_used = np.zeros(len(self.ids), dtype=bool)
+            for flat in order[:np.count_nonzero(valid)]:
+                t, d = divmod(int(flat), n_det)
+                if track_used[t] or det_track[d] >= 0:
+                    continue
+                track_used[t] = True
+                det_track[d] = t
+
+        matched = det_track >= 0
+        rows = det_track[matched]
+        # Скорость рамки сглаживается экспоненциально для экстраполяции между детекциями
+        dt = (now - self.last_seen[rows]).astype(np.float32)[:, None]
+        step = np.where(dt > 0, (boxes[matched] - self.boxes[rows]) / np.maximum(dt, 1e-6), 0)
+        a = self.velocity_smoothing
+        self.velocities[rows] = a * step + (1 - a) * self.velocities[rows]
+        self.boxes[rows] = boxes[matched]
+        self.scores[rows] = scores[matched]
+        self.last_seen[rows] = now
+        self.hits[rows] += 1
+        track_ids = np.zeros(n_det, dtype=np.int64)
+        track_ids[matched] = self.ids[rows]
+
+        is_new = ~matched
+        n_new = int(is_new.sum())
+        if n_new:
+            new_ids = np.arange(self._next_id, self._next_id + n_new, dtype=np.int64)
+            self._next_id += n_new
+            track_ids[is_new] = new_ids
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.boxes = np.concatenate([self.boxes, boxes[is_new]])
+            self.velocities = np.concatenate([self.velocities, np.zeros((n_new, 4), dtype=np.float32)])
+            self.classes = np.concatenate([self.classes, classes[is_new]])
+            self.scores = np.concatenate([self.scores, scores[is_new]])
+            self.first_seen = np.concatenate([self.first_seen, np.full(n_new, now)])
+            self.last_seen = np.concatenate([self.last_seen, np.full(n_new, now)])
+            self.hits = np.concatenate([self.hits, np.ones(n_new, dtype=np.int32)])
+
+        self.last_update = now
+        return track_ids, is_new
+
+    def _select(self, mask):
+        self.ids = self.ids[mask]
+        self.boxes = self.boxes[mask]
+        self.velocities = self.velocities[mask]
+        self.classes = self.classes[mask]
+        self.scores = self.scores[mask]
+        self.first_seen = self.first_seen[mask]
+        self.last_seen = self.last_seen[mask]
+        self.hits = self.hits[mask]
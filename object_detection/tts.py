@@ -0,0 +1,192 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from .metrics import METRICS
+
+
+class GTTSBackend:
+    """Синтез речи через Google TTS (нужен интернет)"""
+
+    name = "gtts"
+    extension = "mp3"
+
+    def __init__(self, lang="en"):
+        from gtts import gTTS
+        self._gtts = gTTS
+        self.lang = lang
+
+    def synthesize(self, text):
+        buffer = io.BytesIO()
+        self._gtts(text=text, lang=self.lang).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class Pyttsx3Backend:
+    """Локальный синтез речи через pyttsx3 (работает без сети)"""
+
+    name = "pyttsx3"
+    extension = "wav"
+
+    def __init__(self, rate=None):
+        import pyttsx3
+        self._engine = pyttsx3.init()
+        if rate is not None:
+            self._engine.setProperty("rate", rate)
+        # Движок pyttsx3 не потокобезопасен
+        self._lock = threading.Lock()
+
+    def synthesize(self, text):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, f"phrase.{self.extension}")
+            with self._lock:
+                self._engine.save_to_file(text, path)
+                self._engine.runAndWait()
+            with open(path, "rb") as f:
+                return f.read()
+
+
+BACKENDS = {
+    GTTSBackend.name: GTTSBackend,
+    Pyttsx3Backend.name: Pyttsx3Backend,
+}
+
+
+def create_backend(name, **kwargs):
+    """Создаёт движок синтеза по имени ('gtts' или 'pyttsx3')"""
+    try:
+        return BACKENDS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend: {name}") from None
+
+
+def quantize_distance(distance, step=0.5):
+    """Округляет расстояние до шага, чтобы одинаковые фразы попадали в кэш"""
+    return round(distance / step) * step
+
+
+def announcement_text(label, distance, step=0.5, count=1, source=None):
+    distance = quantize_distance(distance, step)
+    where = f" on {source}" if source else ""
+    if count > 1:
+        return f"{count} {label}s detected{where}, nearest at distance {distance:.1f} meters"
+    return f"New {label} detected{where} at distance {distance:.1f} meters"
+
+
+class PhraseCache:
+    """Кэш озвученных фраз: LRU в памяти и постоянный уровень на диске.
+
+    Ключ — хэш от имени движка и текста, поэтому файлы разных движков не смешиваются.
+    """
+
+    def __init__(self, backend, cache_dir, max_memory_items=256, max_disk_items=4096):
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.backend.name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.{self.backend.extension}")
+
+    def get(self, text):
+        """Возвращает аудио для фразы, синтезируя его только при промахе"""
+        key = self.key(text)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+
+        path = self._path(key)
+        data = self._read_disk(path)
+        if data is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            with METRICS.timer("tts_synthesis"):
+                data = self.backend.synthesize(text)
+            self._write_disk(path, data)
+            with self._lock:
+                self.misses += 1
+
+        self._remember(key, data)
+        return data
+
+    def contains(self, text):
+        key = self.key(text)
+        with self._lock:
+            if key in self._memory:
+                return True
+        return os.path.exists(self._path(key))
+
+    def prewarm(self, phrases):
+        """Синтезирует фразы заранее; ошибки отдельных фраз не прерывают прогрев"""
+        for text in phrases:
+            if self.contains(text):
+                continue
+            try:
+                self.get(text)
+            except Exception as e:
+                print(f"Error prewarming phrase '{text}': {e}")
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, path):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # Обновляем время доступа для LRU-вытеснения на диске
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write_disk(self, path, data):
+        # Пишем во временный файл и переименовываем, чтобы не оставить обрезанный mp3
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict_disk()
+
+    def _evict_disk(self):
+        suffix = f".{self.backend.extension}"
+        try:
+            entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(suffix)]
+        except OSError:
+            return
+        excess = len(entries) - self.max_disk_items
+        if excess <= 0:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,83 @@
+import logging
+import re
+
+from video_cache import cache_key, normalize_text
+from webm import concat_webm
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+(?:['’]\w+)*")
+
+
+def tokenize(text):
+    """Слова нормализованного текста без знаков препинания"""
+    return WORD_PATTERN.findall(normalize_text(text))
+
+
+class SentenceComposer:
+    """Собирает видео нового предложения из уже сгенерированных слов и фраз.
+
+    Предложение разбивается на самые длинные фразы, которые уже есть в
+    кэше (до max_phrase_words слов). Недостающие слова генерируются
+    браузером по одному и сами попадают в кэш, после чего клипы
+    склеиваются без перекодирования. Если в кэше меньше min_coverage слов
+    предложения, compose() возвращает None: дешевле сгенерировать
+    предложение целиком.
+    """
+
+    def __init__(self, cache, language, generate, max_phrase_words=4, min_coverage=0.5):
+        self.cache = cache
+        self.language = language
+        self.generate = generate  # text -> (key, path или None), с кэшированием и single-flight
+        self.max_phrase_words = max_phrase_words
+        self.min_coverage = min_coverage
+
+    def plan(self, words):
+        """Разбиение на фрагменты [(текст, ключ, в_кэше)] жадным поиском самой длинной фразы"""
+        fragments = []
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_phrase_words, len(words) - i), 0, -1):
+                text = " ".join(words[i:i + n])
+                key = cache_key(text, self.language)
+                cached = self.cache.contains(key)
+                if cached or n == 1:
+                    fragments.append((text, key, cached))
+                    i += n
+                    break
+        return fragments
+
+    def compose(self, text, key):
+        """Склеивает видео для text в кэш под key; None, если собрать не удалось"""
+        words = tokenize(text)
+        if len(words) < 2:
+            return None
+        fragments = self.plan(words)
+        covered = sum(len(fragment.split()) for fragment, _, cached in fragments if cached)
+        if covered < self.min_coverage * len(words):
+            return None
+        logger.info(f"Собираю видео из {len(fragments)} фрагментов, "
+                    f"в кэше {covered} из {len(words)} слов")
+
+        paths = []
+        for fragment, fragment_key, cached in fragments:
+            path = self.cache.get(fragment_key, count=False)
+            if path is None:
+                # В браузер уходят только недостающие слова; они тоже остаются в кэше
+                _, path = self.generate(fragment.title())
+                if path is None:
+                    logger.warning(f"Не удалось сгенерировать фрагмент «{fragment}»")
+                    return None
+            paths.append(path)
+
+        tmp_path = self.cache.temp_path(key)
+        try:
+            with open(tmp_path, "wb") as f:
+                concat_webm(paths, f)
+            return self.cache.commit(key, tmp_path, text)
+        except (OSError, ValueError) as e:
+            # Например, фрагмент вытеснен из кэша или у клипов разные дорожки
+            logger.warning(f"Не удалось склеить видео: {e}")
+            return None
+        finally:
+            self.cache.discard(tmp_path)
@@ -0,0 +1,201 @@
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from metrics import METRICS, TRACER
+
+logger = logging.getLogger(__name__)
+
+SIGN_MT_URL = os.environ.get("SIGN_MT_URL", "https://sign.mt")
+
+
+def resolve_driver_path():
+    """Путь к chromedriver: из CHROMEDRIVER_PATH или через webdriver_manager, один раз при старте"""
+    path = os.environ.get("CHROMEDRIVER_PATH")
+    if path:
+        return path
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+
+def chrome_options():
+    options = webdriver.ChromeOptions()
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--headless")  # Безголовый режим для сервера
+    return options
+
+
+class PooledDriver:
+    """Браузер из пула и число выполненных на нём запросов"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created = time.monotonic()
+
+
+class DriverPool:
+    """Пул заранее запущенных headless Chrome с уже открытым sign.mt.
+
+    Запрос берёт готовый браузер через acquire(), после работы браузер
+    возвращается в фоновый поток обслуживания: там страница перезагружается
+    (сбрасывается введённый текст и старое видео) и проверяется, что браузер
+    жив. Упавший браузер или браузер, отработавший max_uses запросов,
+    закрывается и заменяется новым.
+    """
+
+    def __init__(self, size=2, max_uses=50, url=SIGN_MT_URL, driver_path=None, page_timeout=10):
+        self.size = size
+        self.max_uses = max_uses
+        self.url = url
+        self.page_timeout = page_timeout
+        self.driver_path = driver_path or resolve_driver_path()
+        self._idle = queue.Queue()
+        self._returned = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._drivers = set()  # все живые браузеры пула, для закрытия
+        self._maintainer = threading.Thread(target=self._maintain, name="driver-pool", daemon=True)
+
+    def start(self):
+        """Параллельно запускает size браузеров и открывает в них sign.mt"""
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self._add_driver()), daemon=True)
+                   for _ in range(self.size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._maintainer.start()
+        logger.info(f"Пул браузеров готов: {self._idle.qsize()} из {self.size}")
+        # Не запустившиеся места добираются в фоне с паузами, как после падения браузера
+        for _ in range(results.count(False)):
+            self._replace_async()
+        return self
+
+    def _launch(self):
+        with TRACER.phase("driver_launch"):
+            driver = webdriver.Chrome(service=Service(self.driver_path), options=chrome_options())
+        try:
+            self._load_page(driver)
+        except Exception:
+            driver.quit()
+            raise
+        return driver
+
+    def _load_page(self, driver):
+        with TRACER.phase("page_load"):
+            driver.get(self.url)
+            WebDriverWait(driver, self.page_timeout).until(EC.presence_of_element_located((By.ID, "desktop")))
+
+    def _add_driver(self):
+        try:
+            pooled = PooledDriver(self._launch())
+        except Exception as e:
+            logger.error(f"Не удалось запустить браузер: {e}")
+            return False
+        with self._lock:
+            if self._closed:
+                pooled.driver.quit()
+                return False
+            self._drivers.add(pooled)
+        self._idle.put(pooled)
+        return True
+
+    def idle(self):
+        """Число готовых браузеров, ожидающих запроса"""
+        return self._idle.qsize()
+
+    def _discard(self, pooled):
+        METRICS.inc("driver_restarts")
+        with self._lock:
+            self._drivers.discard(pooled)
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """Готовый браузер с открытым sign.mt; TimeoutError, если свободных нет дольше timeout"""
+        try:
+            with TRACER.phase("pool_wait"):
+                return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            METRICS.inc("pool_timeouts")
+            raise TimeoutError("Нет свободного браузера") from None
+
+    def release(self, pooled):
+        """Возвращает браузер; сброс страницы и проверка идут в фоне, не задерживая запрос"""
+        pooled.uses += 1
+        self._returned.put(pooled)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        pooled = self.acquire(timeout)
+        try:
+            yield pooled.driver
+        finally:
+            self.release(pooled)
+
+    def _healthy(self, driver):
+        try:
+            return driver.execute_script("return document.readyState") == "complete"
+        except Exception:
+            return False
+
+    def _maintain(self):
+        while True:
+            pooled = self._returned.get()
+            if pooled is None:
+                return
+            if pooled.uses >= self.max_uses:
+                logger.info(f"Браузер отработал {pooled.uses} запросов, перезапускаю")
+                self._discard(pooled)
+                self._replace_async()
+                continue
+            try:
+                # Перезагрузка сбрасывает текст и видео прошлого запроса
+                self._load_page(pooled.driver)
+                if not self._healthy(pooled.driver):
+                    raise RuntimeError("страница не загрузилась")
+            except Exception as e:
+                logger.warning(f"Браузер не прошёл проверку ({e}), перезапускаю")
+                self._discard(pooled)
+                self._replace_async()
+                continue
+            self._idle.put(pooled)
+
+    def _replace_async(self):
+        # Запуск Chrome занимает секунды: не задерживаем сброс остальных браузеров
+        threading.Thread(target=self._replace, daemon=True).start()
+
+    def _replace(self):
+        # Повторяем запуск с паузой, пока пул не восстановится или не будет закрыт
+        delay = 1.0
+        while not self._closed and not self._add_driver():
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            drivers = list(self._drivers)
+            self._drivers.clear()
+        self._returned.put(None)
+        for pooled in drivers:
+            try:
+                pooled.driver.quit()
+            except Exception:
+                pass
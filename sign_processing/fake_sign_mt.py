@@ -0,0 +1,198 @@
+"""Локальная замена sign.mt для бенчмарков и проверок без сети.
+
+Повторяет только то, на что опирается get_signs.py: поле #desktop и
+элемент <video>, которому через заданную задержку после ввода текста
+выставляется blob: src. Клип — настоящий WebM (по умолчанию
+static/videos/HowAreYou.webm), дополненный EBML-элементом Void до нужного
+размера, поэтому его можно и скачать, и склеить.
+
+Пример:
+    python fake_sign_mt.py --port 4200 --delay 2 --clip-kb 200 800
+    SIGN_MT_URL=http://127.0.0.1:4200/ python get_signs.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BASE_CLIP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "videos", "HowAreYou.webm")
+VOID = 0xEC  # EBML Void: читатели WebM его пропускают
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>sign.mt stand-in</title></head>
+<body>
+<textarea id="desktop"></textarea>
+<div id="output"></div>
+<script>
+const CONFIG = %(config)s;
+const textarea = document.getElementById("desktop");
+let timer = null;
+let generation = 0;
+
+// Как на sign.mt: перевод запускается, когда ввод затих
+textarea.addEventListener("input", () => {
+    clearTimeout(timer);
+    const current = ++generation;
+    const text = textarea.value.trim();
+    if (!text) return;
+    const delay = CONFIG.delay_ms + Math.random() * CONFIG.jitter_ms;
+    timer = setTimeout(() => render(text, current), delay);
+});
+
+async function render(text, current) {
+    const response = await fetch("clip.webm?text=" + encodeURIComponent(text));
+    if (!response.ok || current !== generation) return;
+    const blob = await response.blob();
+    let video = document.querySelector("#output video");
+    if (!video) {
+        video = document.createElement("video");
+        video.muted = true;
+        document.getElementById("output").appendChild(video);
+    }
+    video.src = URL.createObjectURL(blob);
+}
+</script>
+</body>
+</html>
+"""
+
+
+def _void(size):
+    """Элемент Void общим размером size байт (не меньше 9)"""
+    payload = size - 9
+    return bytes([VOID]) + (payload | (1 << 56)).to_bytes(8, "big") + bytes(payload)
+
+
+class FakeSignMT:
+    """Настройки замены и заготовленные клипы.
+
+    delay и jitter — секунды от последнего ввода до появления видео;
+    размер клипа выбирается в [clip_bytes_min, clip_bytes_max]
+    детерминированно по тексту, так что один текст всегда даёт тот же файл.
+    fail_rate — доля текстов, для которых видео не появляется никогда
+    (проверка таймаутов).
+    """
+
+    def __init__(self, delay=2.0, jitter=0.0, clip_bytes_min=0, clip_bytes_max=None, fail_rate=0.0,
+                 base_clip=BASE_CLIP):
+        self.delay = delay
+        self.jitter = jitter
+        self.clip_bytes_min = clip_bytes_min
+        self.clip_bytes_max = max(clip_bytes_min, clip_bytes_max or clip_bytes_min)
+        self.fail_rate = fail_rate
+        with open(base_clip, "rb") as f:
+            self.base = f.read()
+        self._clips = {}  # размер -> байты
+        self._lock = threading.Lock()
+        self.pages_served = 0
+        self.clips_served = 0
+
+    def _rng(self, text):
+        return random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+
+    def clip(self, text):
+        """Байты клипа для текста или None, если этот текст «не переводится»"""
+        rng = self._rng(text)
+        if rng.random() < self.fail_rate:
+            return None
+        size = rng.randint(self.clip_bytes_min, self.clip_bytes_max)
+        # Void короче 9 байт не записать: небольшой недобор до размера допустим
+        padding = size - len(self.base)
+        size = len(self.base) + (padding if padding >= 9 else 0)
+        with self._lock:
+            data = self._clips.get(size)
+            if data is None:
+                data = self.base + (_void(padding) if size > len(self.base) else b"")
+                self._clips[size] = data
+            self.clips_served += 1
+        return data
+
+    def page(self):
+        with self._lock:
+            self.pages_served += 1
+        config = {"delay_ms": self.delay * 1000, "jitter_ms": self.jitter * 1000}
+        return (PAGE % {"config": json.dumps(config)}).encode("utf-8")
+
+
+def _make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path in ("/", "/index.html"):
+                self._send(200, "text/html; charset=utf-8", fake.page())
+            elif url.path == "/clip.webm":
+                text = parse_qs(url.query).get("text", [""])[0]
+                data = fake.clip(text)
+                if data is None:
+                    # Страница не дождётся видео: поведение зависшего перевода
+                    self._send(503, "text/plain", b"translation failed")
+                else:
+                    self._send(200, "video/webm", data)
+            else:
+                self._send(404, "text/plain", b"not found")
+
+        def _send(self, status, content_type, body):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_fake_sign_mt(fake, host="127.0.0.1", port=0):
+    """Запускает сервер в фоновом потоке; port=0 — любой свободный порт (server.server_port)"""
+    server = ThreadingHTTPServer((host, port), _make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-sign-mt", daemon=True).start()
+    return server
+
+
+def add_fake_arguments(parser):
+    parser.add_argument("--delay", type=float, default=2.0, help="seconds from the last keystroke to the video")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay, seconds")
+    parser.add_argument("--clip-kb", type=int, nargs="+", default=[0], metavar=("MIN", "MAX"),
+                        help="clip size in KiB, or a range; the base clip is padded up to it")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of texts that never get a video")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline stand-in for sign.mt")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4200)
+    add_fake_arguments(parser)
+    return parser
+
+
+def fake_from_args(args):
+    sizes = [kb * 1024 for kb in args.clip_kb[:2]]
+    return FakeSignMT(delay=args.delay, jitter=args.jitter, clip_bytes_min=sizes[0],
+                      clip_bytes_max=sizes[-1], fail_rate=args.fail_rate)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    server = start_fake_sign_mt(fake_from_args(args), args.host, args.port)
+    print(f"sign.mt stand-in on http://{args.host}:{server.server_port}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
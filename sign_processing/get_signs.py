@@ -282,98 +282,383 @@
 #     uvicorn.run(app, host="0.0.0.0", port=8000)
 
 
-from flask import Flask, render_template, request, send_file
-from selenium import webdriver
+from flask import Flask, Response, abort, jsonify, render_template, request, send_file, url_for
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 import os
-import time
+import atexit
 import base64
+import hashlib
+import json
 import logging
+import threading
+import time
+
+from composer import SentenceComposer
+from driver_pool import DriverPool
+from jobs import DONE, JobManager, QueueFull
+from metrics import METRICS, TRACER
+from video_cache import KEY_PATTERN, VideoCache, cache_key
 
 app = Flask(__name__)
+# За nginx/Apache файл отдаёт сам веб-сервер по заголовку X-Sendfile
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE") == "1"
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def setup_driver():
-    options = webdriver.ChromeOptions()
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--headless")  # Безголовый режим для сервера
-    return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", "2"))
+DRIVER_MAX_USES = int(os.environ.get("DRIVER_MAX_USES", "50"))
+POOL_WAIT_TIMEOUT = 60  # Сколько запрос ждёт свободный браузер, с
+MAX_PENDING_JOBS = int(os.environ.get("MAX_PENDING_JOBS", "16"))  # Дальше — 429
+RETRY_AFTER_SECONDS = 10
+SSE_KEEPALIVE_SECONDS = 15
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # Байт видео за один вызов WebDriver
+VIDEO_MAX_AGE = 365 * 24 * 3600  # Видео под ключом неизменно: кэшируем в браузере на год
+
+# Только пространство имён кэша: входит в ключ, но на sign.mt язык не выставляется —
+# браузер переводит на языке страницы по умолчанию. Менять вместе с языком страницы
+# (например, SIGN_MT_URL с нужными параметрами), чтобы видео разных языков не смешивались
+SIGN_LANGUAGE = os.environ.get("SIGN_LANGUAGE", "en-ase")
+# Не внутри static: иначе index.json и недописанные .part отдавались бы через /static;
+# видео отдаются только маршрутом /videos/<key>.webm
+VIDEO_CACHE_DIR = os.environ.get("VIDEO_CACHE_DIR", os.path.join(app.instance_path, "videos"))
+VIDEO_CACHE_MAX_MB = int(os.environ.get("VIDEO_CACHE_MAX_MB", "1024"))
+# Доля слов предложения, которая должна быть в кэше, чтобы собирать видео из фрагментов
+COMPOSE_MIN_COVERAGE = float(os.environ.get("COMPOSE_MIN_COVERAGE", "0.5"))
+
+# Запросы дольше SLOW_REQUEST_SECONDS с вероятностью SLOW_TRACE_SAMPLE пишутся целиком в trace-лог
+TRACER.slow_seconds = float(os.environ.get("SLOW_REQUEST_SECONDS", "20"))
+TRACER.sample_rate = float(os.environ.get("SLOW_TRACE_SAMPLE", "1.0"))
+TRACER.log_path = os.environ.get("SLOW_TRACE_LOG", "slow_requests.jsonl")
+
+# Пул браузеров создаётся при первом обращении (get_pool), под любым WSGI-сервером
+pool = None
+_pool_lock = threading.Lock()
+video_cache = VideoCache(VIDEO_CACHE_DIR, max_bytes=VIDEO_CACHE_MAX_MB << 20)
+
+# Страница сама сообщает о готовности видео: MutationObserver ловит появление
+# <video> с src, без опроса через WebDriver. null по истечении таймаута.
+WAIT_FOR_VIDEO_JS = """
+const timeoutMs = arguments[0];
+const done = arguments[arguments.length - 1];
+let finished = false;
+let observer = null;
+function finish(video) {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    document.removeEventListener("loadeddata", check, true);
+    clearTimeout(timer);
+    done(video);
+}
+function check() {
+    for (const video of document.querySelectorAll("video")) {
+        if (video.getAttribute("src") || video.currentSrc) {
+            finish(video);
+            return true;
+        }
+    }
+    return false;
+}
+const timer = setTimeout(() => finish(null), timeoutMs);
+if (!check()) {
+    observer = new MutationObserver(check);
+    observer.observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true, attributeFilter: ["src"]
+    });
+    // src, выставленный свойством без атрибута, виден по событию loadeddata
+    document.addEventListener("loadeddata", check, true);
+}
+"""
 
 def wait_for_video(driver, timeout=30):
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            video_element = WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.TAG_NAME, "video"))
-            )
-            if video_element.get_attribute("src"):
-                logger.info("Видео элемент найден")
-                return video_element
-        except Exception:
-            logger.info(f"Ожидание видео... ({int(time.time() - start_time)} сек)")
-            time.sleep(1)
-    raise TimeoutException("Видео не было сгенерировано в течение 30 секунд")
+    # Запас к таймауту скрипта: сначала срабатывает таймер на странице
+    driver.set_script_timeout(timeout + 5)
+    with TRACER.phase("generation_wait"):
+        video_element = driver.execute_async_script(WAIT_FOR_VIDEO_JS, timeout * 1000)
+    if video_element is None:
+        METRICS.inc("video_timeouts")
+        raise TimeoutException(f"Видео не было сгенерировано в течение {timeout} секунд")
+    logger.info("Видео элемент найден")
+    return video_element
+
+# Видео читается в странице один раз и остаётся там как Blob; размер и
+# SHA-256 (если доступен crypto.subtle) нужны для проверки целостности
+FETCH_VIDEO_JS = """
+const video = arguments[0];
+const done = arguments[arguments.length - 1];
+fetch(video.currentSrc || video.src)
+    .then(response => {
+        if (!response.ok) throw new Error("Ошибка загрузки видео: " + response.status);
+        return response.blob();
+    })
+    .then(async blob => {
+        window.__signVideo = blob;
+        let sha256 = null;
+        if (window.crypto && crypto.subtle) {
+            const digest = await crypto.subtle.digest("SHA-256", await blob.arrayBuffer());
+            sha256 = Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, "0")).join("");
+        }
+        done({size: blob.size, sha256: sha256});
+    })
+    .catch(error => done({error: String(error)}));
+"""
+
+# Один кусок Blob в base64; память на стороне Python ограничена размером куска
+READ_CHUNK_JS = """
+const [offset, length] = arguments;
+const done = arguments[arguments.length - 1];
+const reader = new FileReader();
+reader.onloadend = () => done(reader.error ? {error: String(reader.error)} : reader.result.split(",", 2)[1]);
+reader.readAsDataURL(window.__signVideo.slice(offset, offset + length));
+"""
 
 def download_video(driver, video_element, save_path):
     try:
-        js_script = """
-        return new Promise((resolve, reject) => {
-            const video = arguments[0];
-            const xhr = new XMLHttpRequest();
-            xhr.open('GET', video.src, true);
-            xhr.responseType = 'blob';
-            xhr.onload = function() {
-                if (xhr.status === 200) {
-                    const reader = new FileReader();
-                    reader.onloadend = function() {
-                        resolve(reader.result);
-                    };
-                    reader.readAsDataURL(xhr.response);
-                } else {
-                    reject('Ошибка загрузки видео');
-                }
-            };
-            xhr.onerror = function() {
-                reject('Ошибка сети');
-            };
-            xhr.send();
-        });
-        """
-        
-        base64_data = driver.execute_script(js_script, video_element)
-        if not base64_data:
-            raise Exception("Не удалось получить данные видео")
-            
-        base64_data = base64_data.split(',')[1]
-        video_data = base64.b64decode(base64_data)
-        
+        with TRACER.phase("fetch_blob"):
+            info = driver.execute_async_script(FETCH_VIDEO_JS, video_element)
+        if not info or info.get("error"):
+            raise Exception((info or {}).get("error") or "Не удалось получить данные видео")
+        size = info["size"]
+        if size == 0:
+            logger.error("Ошибка: Файл пустой")
+            return False
+
+        # Куски по DOWNLOAD_CHUNK_SIZE пишутся сразу в файл: полный base64 видео в памяти не собирается
+        digest = hashlib.sha256()
+        written = 0
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
         with open(save_path, 'wb') as f:
-            f.write(video_data)
-            
-        if os.path.getsize(save_path) > 0:
-            logger.info(f"Видео успешно сохранено в {save_path}")
-            return True
-        else:
-            logger.error("Ошибка: Файл пустой")
+            while written < size:
+                with TRACER.phase("transfer"):
+                    chunk = driver.execute_async_script(READ_CHUNK_JS, written, DOWNLOAD_CHUNK_SIZE)
+                    if not isinstance(chunk, str):
+                        raise Exception((chunk or {}).get("error") or "Не удалось прочитать данные видео")
+                    data = base64.b64decode(chunk)
+                if not data:
+                    break
+                with TRACER.phase("disk_write"):
+                    f.write(data)
+                digest.update(data)
+                written += len(data)
+
+        if written != size:
+            logger.error(f"Ошибка: записано {written} байт из {size}")
             return False
+        if info.get("sha256") and digest.hexdigest() != info["sha256"]:
+            logger.error("Ошибка: контрольная сумма видео не совпадает")
+            return False
+        METRICS.inc("bytes_written", written)
+        logger.info(f"Видео успешно сохранено в {save_path} ({written} байт)")
+        return True
     except Exception as e:
         logger.error(f"Ошибка при скачивании видео: {str(e)}")
         return False
+    finally:
+        try:
+            driver.execute_script("delete window.__signVideo;")
+        except Exception:
+            pass
+
+def get_pool():
+    """Пул браузеров процесса; запускается один раз при первом вызове"""
+    global pool
+    if pool is None:
+        with _pool_lock:
+            if pool is None:
+                pool = DriverPool(size=POOL_SIZE, max_uses=DRIVER_MAX_USES).start()
+                atexit.register(pool.close)
+    return pool
+
+def generate_video(text, save_path):
+    """Генерирует видео для текста в браузере из пула и сохраняет в save_path"""
+    logger.info("Беру браузер из пула...")
+    with get_pool().driver(timeout=POOL_WAIT_TIMEOUT) as driver:
+        # sign.mt уже открыт: пул перезагружает страницу после каждого запроса
+        logger.info("Ввожу текст...")
+        with TRACER.phase("typing"):
+            textarea = WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.ID, "desktop"))
+            )
+            textarea.clear()
+            textarea.send_keys(text)
+
+        video_element = wait_for_video(driver)
+        return bool(video_element) and download_video(driver, video_element, save_path)
+
+def get_video(text, compose=True, request_id=None):
+    """Путь к видео для текста: из кэша, склейкой закэшированных фраз или браузером.
+
+    Вызов трассируется как запрос request_id; внутри уже идущего запроса
+    (склейка догенерирует слова) фазы добавляются к нему.
+    """
+    with TRACER.request(request_id, text) as trace:
+        key, path = _get_video(text, compose)
+        # Внешний вызов выходит последним: его исход и остаётся в трассировке
+        trace.outcome = "done" if path else "failed"
+        return key, path
+
+def _get_video(text, compose):
+    key = cache_key(text, SIGN_LANGUAGE)
+    with TRACER.phase("cache_lookup"):
+        # Попадание или промах запроса уже учтён в submit_text
+        path = video_cache.get(key, count=False)
+    if path:
+        logger.info("Видео найдено в кэше")
+        return key, path
+
+    # Новое предложение из знакомых слов собирается из кэша без браузера
+    if compose:
+        with TRACER.phase("compose"):
+            path = composer.compose(text, key)
+        if path:
+            return key, path
+
+    tmp_path = video_cache.temp_path(key)
+    try:
+        if not generate_video(text, tmp_path):
+            return key, None
+        with TRACER.phase("commit"):
+            return key, video_cache.commit(key, tmp_path, text)
+    finally:
+        video_cache.discard(tmp_path)
+
+def generate_fragment(text):
+    """Недостающий фрагмент для склейки: с тем же single-flight, что и задачи пользователей"""
+    key = cache_key(text, SIGN_LANGUAGE)
+    return key, jobs.run_inline(key, text)
+
+composer = SentenceComposer(video_cache, SIGN_LANGUAGE, generate_fragment, min_coverage=COMPOSE_MIN_COVERAGE)
+
+def run_job(job):
+    """Исполнитель задачи: идентификатор задачи — идентификатор запроса в трассировке"""
+    # Запрос отсчитывается от постановки в очередь: queue_wait входит в request_total
+    with TRACER.request(job.id, job.text, started_at=job.created) as trace:
+        if trace.request_id == job.id:
+            # Фрагмент склейки выполняется внутри чужого запроса и очереди не ждал
+            trace.add("queue_wait", time.time() - job.created)
+        return get_video(job.text)[1]
+
+
+# Генерация идёт в фоне: запрос не держит поток Flask на всё время работы браузера
+jobs = JobManager(run_job, workers=POOL_SIZE, max_pending=MAX_PENDING_JOBS)
+
+METRICS.gauge("pool_idle", lambda: pool.idle() if pool else None)
+METRICS.gauge("pool_size", lambda: POOL_SIZE)
+METRICS.gauge("jobs_pending", jobs.pending)
+METRICS.gauge("jobs_deduplicated", lambda: jobs.deduplicated)
+METRICS.gauge("jobs_rejected", lambda: jobs.rejected)
+METRICS.gauge("cache_hits", lambda: video_cache.hits)
+METRICS.gauge("cache_misses", lambda: video_cache.misses)
+METRICS.gauge("cache_bytes", video_cache.total_bytes)
+
+def video_url_for(key):
+    return url_for("video", key=key)
+
+@app.route("/videos/<key>.webm")
+def video(key):
+    """Отдаёт видео из кэша с поддержкой Range (206) и If-None-Match (304).
+
+    Содержимое под ключом не меняется, поэтому ETag — сам ключ, а браузер
+    может кэшировать файл без повторных проверок. Файл отдаётся через
+    wsgi.file_wrapper (sendfile в gunicorn/uwsgi) или X-Sendfile за nginx.
+    """
+    if not KEY_PATTERN.match(key) or not video_cache.contains(key):
+        abort(404)
+    response = send_file(video_cache.path(key), mimetype="video/webm", conditional=True, etag=key,
+                         max_age=VIDEO_MAX_AGE)
+    response.headers["Cache-Control"] = f"public, max-age={VIDEO_MAX_AGE}, immutable"
+    return response
+
+def job_state(job):
+    state = job.to_dict()
+    state["status_url"] = url_for("job_status", job_id=job.id)
+    state["events_url"] = url_for("job_events", job_id=job.id)
+    if job.status == DONE:
+        state["video_url"] = video_url_for(job.key)
+    return state
+
+def submit_text(text):
+    """Отдаёт видео из кэша сразу или ставит генерацию в очередь.
+
+    Возвращает (video_url, job); при переполненной очереди бросает QueueFull.
+    """
+    key = cache_key(text, SIGN_LANGUAGE)
+    # Единственная учитываемая проверка кэша на запрос пользователя
+    if video_cache.get(key):
+        logger.info("Видео найдено в кэше")
+        return video_url_for(key), None
+    job, created = jobs.submit(key, text)
+    if not created:
+        logger.info(f"Присоединяюсь к задаче {job.id} для того же текста")
+    return None, job
+
+@app.route("/api/jobs", methods=["POST"])
+def create_job():
+    data = request.get_json(silent=True) or request.form
+    text = (data.get("text") or "").title().strip()
+    if not text:
+        return jsonify(error="Введите текст для перевода!"), 400
+    try:
+        video_url, job = submit_text(text)
+    except QueueFull as e:
+        response = jsonify(error=str(e))
+        response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+        return response, 429
+    if job is None:
+        return jsonify(status=DONE, video_url=video_url), 200
+    return jsonify(job_state(job)), 202, {"Location": url_for("job_status", job_id=job.id),
+                                          "X-Request-ID": job.id}
+
+@app.route("/api/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify(error="Задача не найдена"), 404
+    return jsonify(job_state(job))
+
+@app.route("/api/jobs/<job_id>/events")
+def job_events(job_id):
+    """Статус задачи в формате server-sent events до её завершения"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify(error="Задача не найдена"), 404
+    state = job_state(job)
+    video_url = video_url_for(job.key)
+
+    def stream():
+        version = -1
+        while True:
+            current = job.wait_change(version, timeout=SSE_KEEPALIVE_SECONDS)
+            if current == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = current
+            state.update(job.to_dict())
+            if job.status == DONE:
+                state["video_url"] = video_url
+            yield f"data: {json.dumps(state, ensure_ascii=False)}\n\n"
+            if job.final:
+                return
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route("/metrics")
+def metrics():
+    """Счётчики и гистограммы фаз в текстовом формате Prometheus"""
+    return Response(METRICS.to_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/metrics.json")
+def metrics_json():
+    return jsonify(METRICS.snapshot())
 
 @app.route("/", methods=["GET", "POST"])
 def index():
     error = None
     video_url = None
+    job = None
     
     if request.method == "POST":
         text = request.form.get("text", "").title().strip()
@@ -381,36 +666,21 @@ def index():
             error = "Введите текст для перевода!"
         else:
             try:
-                save_path = f"C:\\Users\\TM\\Desktop\\Хакатоны\\Project2\\Sign-er\\sign_processing\\static\\videos\\{''.join(text.split())}.webm"
-                logger.info("Запускаю браузер...")
-                driver = setup_driver()
-                
-                try:
-                    logger.info("Открываю сайт...")
-                    driver.get("https://sign.mt")
-                    
-                    logger.info("Ввожу текст...")
-                    textarea = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.ID, "desktop"))
-                    )
-                    textarea.clear()
-                    textarea.send_keys(text)
-                    
-                    video_element = wait_for_video(driver)
-                    
-                    if video_element and download_video(driver, video_element, save_path):
-                        video_url = f"C:\\Users\\TM\\Desktop\\Хакатоны\\Project2\\Sign-er\\sign_processing\\static\\video\\{''.join(text.split())}.webm"
-                    else:
-                        error = "Не удалось сгенерировать или скачать видео"
-                        
-                finally:
-                    driver.quit()
-                    
+                video_url, job = submit_text(text)
+            except QueueFull:
+                error = "Сервер перегружен, попробуйте через минуту"
             except Exception as e:
                 error = f"Произошла ошибка: {str(e)}"
     
-    return render_template("index.html", error=error, video_url=video_url)
+    return render_template("index.html", error=error, video_url=video_url,
+                           job=job_state(job) if job else None)
 
 if __name__ == "__main__":
-    os.makedirs("static/videos", exist_ok=True)
-    app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
+    # Браузеры запускаются до первого запроса, а не при нём
+    get_pool()
+    try:
+        # Перезагрузчик Flask запустил бы второй процесс со своим пулом браузеров
+        app.run(debug=True, use_reloader=False, host="0.0.0.0", port=5000)
+    finally:
+        jobs.shutdown()
+        pool.close()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """Очередь генерации заполнена: клиенту отвечаем 429"""
+
+
+class Job:
+    """Задача генерации видео для одного нормализованного текста"""
+
+    def __init__(self, key, text):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.text = text
+        self.status = QUEUED
+        self.path = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.version = 0  # растёт при каждой смене статуса, для SSE
+        self._cond = threading.Condition()
+
+    @property
+    def final(self):
+        return self.status in (DONE, FAILED)
+
+    def _set(self, status, path=None, error=None):
+        with self._cond:
+            self.status = status
+            self.path = path
+            self.error = error
+            if self.final:
+                self.finished = time.time()
+            self.version += 1
+            self._cond.notify_all()
+
+    def wait_change(self, version, timeout=None):
+        """Ждёт смены статуса после version; возвращает текущую версию"""
+        with self._cond:
+            if self.version == version and not self.final:
+                self._cond.wait(timeout)
+            return self.version
+
+    def wait(self, timeout=None):
+        """Ждёт завершения задачи; True, если она завершилась за timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self.final:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def to_dict(self):
+        return {"id": self.id, "status": self.status, "text": self.text, "error": self.error,
+                "created": self.created, "finished": self.finished}
+
+
+class JobManager:
+    """Очередь генерации с ограниченным пулом исполнителей и объединением дублей.
+
+    Одинаковые по ключу запросы, пока задача не завершена, получают одну и ту
+    же задачу (single-flight), поэтому на один текст запускается один
+    браузер. run_inline() даёт тот же single-flight для генерации внутри
+    уже идущей задачи (недостающие слова при склейке). Если ожидающих задач больше max_pending, submit() бросает
+    QueueFull, а не копит очередь без ограничений. Завершённые задачи
+    хранятся keep_seconds, чтобы клиент успел забрать результат.
+    """
+
+    def __init__(self, run, workers=2, max_pending=16, keep_seconds=600):
+        self.run = run  # Job -> путь к видео или None
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sign-job")
+        self._lock = threading.Lock()
+        self._jobs = {}  # id -> Job
+        self._inflight = {}  # key -> Job
+        self.deduplicated = 0
+        self.rejected = 0
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for job in self._inflight.values() if job.status == QUEUED)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def submit(self, key, text):
+        """Возвращает (job, created); created=False, если присоединились к идущей задаче"""
+        with self._lock:
+            self._forget_old()
+            job = self._inflight.get(key)
+            if job is not None:
+                self.deduplicated += 1
+                return job, False
+            if sum(1 for j in self._inflight.values() if j.status == QUEUED) >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f"Слишком много задач в очереди ({self.max_pending})")
+            job = Job(key, text)
+            self._jobs[job.id] = job
+            self._inflight[key] = job
+        self._executor.submit(self._execute, job)
+        return job, True
+
+    def run_inline(self, key, text):
+        """Выполняет задачу в текущем потоке и возвращает путь к видео или None.
+
+        Если задача с этим ключом уже идёт, ждёт её. Если она ещё в очереди,
+        выполняет её здесь: иначе исполнители, занятые ожиданием, могли бы
+        никогда до неё не дойти. Очередь и её лимит не используются.
+        """
+        with self._lock:
+            job = self._inflight.get(key)
+            if job is None:
+                job = Job(key, text)
+                self._jobs[job.id] = job
+                self._inflight[key] = job
+            else:
+                self.deduplicated += 1
+        if not self._execute(job):
+            job.wait()
+        return job.path
+
+    def _execute(self, job):
+        """Выполняет задачу, если её ещё никто не взял; True, если выполнил этот вызов"""
+        with self._lock:
+            if job.status != QUEUED:
+                return False
+            job._set(RUNNING)
+        try:
+            path = self.run(job)
+        except Exception as e:
+            logger.error(f"Задача {job.id} завершилась ошибкой: {e}")
+            path, error = None, f"Произошла ошибка: {e}"
+        else:
+            error = None if path else "Не удалось сгенерировать или скачать видео"
+        job._set(DONE if path else FAILED, path=path, error=error)
+        with self._lock:
+            self._inflight.pop(job.key, None)
+        return True
+
+    def _forget_old(self):
+        """Удаляет давно завершённые задачи; вызывается под self._lock"""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.final and now - job.finished > self.keep_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,227 @@
+"""Нагрузочный тест get_signs.py против локальной замены sign.mt.
+
+Поднимает fake_sign_mt, пул headless Chrome и Flask-приложение в одном
+процессе и отправляет в /api/jobs заданное число запросов с заданной
+параллельностью. Каждый клиент ждёт результат через SSE и скачивает
+видео. В отчёте — перцентили задержки, пропускная способность, пиковая
+память процесса вместе с браузерами и пиковое число браузеров. Сеть не
+нужна: chromedriver берётся из CHROMEDRIVER_PATH.
+
+Пример:
+    CHROMEDRIVER_PATH=/usr/bin/chromedriver python loadtest.py --requests 40 --concurrency 8 \\
+        --pool-size 2 --delay 1.5 --clip-kb 100 400 --repeat 0.25 --output loadtest.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import psutil
+from werkzeug.serving import make_server
+
+from fake_sign_mt import add_fake_arguments, fake_from_args, start_fake_sign_mt
+from metrics import percentiles
+
+
+# Тот же метод перцентилей, что в /metrics сервера и в pregenerate.py
+LATENCY_QUANTILES = (0.50, 0.90, 0.95, 0.99)
+
+
+class ProcessSampler:
+    """Фоновый замер памяти процесса с дочерними (chromedriver, Chrome) и числа браузеров"""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak_rss = 0
+        self.peak_browsers = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loadtest-sampler", daemon=True)
+
+    def sample(self):
+        """(RSS всего дерева процессов в байтах, число запущенных браузеров)"""
+        rss = self.process.memory_info().rss
+        children = self.process.children(recursive=True)
+        drivers = set()
+        parents = []
+        for child in children:
+            try:
+                rss += child.memory_info().rss
+                if "chromedriver" in child.name():
+                    drivers.add(child.pid)
+                parents.append(child.ppid())
+            except psutil.NoSuchProcess:
+                continue
+        # Браузер — главный процесс Chrome, запущенный chromedriver; вкладки и GPU-процессы не считаются
+        browsers = sum(1 for ppid in parents if ppid in drivers)
+        return rss, browsers
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss, browsers = self.sample()
+            self.peak_rss = max(self.peak_rss, rss)
+            self.peak_browsers = max(self.peak_browsers, browsers)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def make_phrases(count, repeat, seed=0):
+    """count фраз, из которых доля repeat повторяет уже отправленные (попадания в кэш и дубли)"""
+    rng = random.Random(seed)
+    phrases = []
+    for i in range(count):
+        if phrases and rng.random() < repeat:
+            phrases.append(rng.choice(phrases))
+        else:
+            phrases.append(f"Load Test Phrase {i}")
+    return phrases
+
+
+def run_client(base_url, text, timeout):
+    """Один пользовательский запрос: (исход, секунды, байт видео)"""
+    started = time.perf_counter()
+    request = Request(base_url + "/api/jobs", data=json.dumps({"text": text}).encode("utf-8"),
+                      headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            state = json.load(response)
+            outcome = "cached" if response.status == 200 else "generated"
+    except HTTPError as e:
+        return ("rejected" if e.code == 429 else "error"), time.perf_counter() - started, 0
+
+    if state.get("status") != "done":
+        # Ждём завершения задачи по SSE, как страница index.html
+        with urlopen(base_url + state["events_url"], timeout=timeout) as events:
+            for line in events:
+                if line.startswith(b"data: "):
+                    state = json.loads(line[len(b"data: "):])
+                    if state["status"] in ("done", "failed"):
+                        break
+    if state.get("status") != "done":
+        return "failed", time.perf_counter() - started, 0
+
+    with urlopen(base_url + state["video_url"], timeout=timeout) as response:
+        size = len(response.read())
+    return outcome, time.perf_counter() - started, size
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Load-test the sign video server against a local sign.mt stand-in")
+    parser.add_argument("--requests", type=int, default=20, help="total requests to send")
+    parser.add_argument("--concurrency", type=int, default=4, help="clients sending requests in parallel")
+    parser.add_argument("--pool-size", type=int, default=2, help="browsers in the driver pool")
+    parser.add_argument("--max-pending", type=int, default=16, help="queued jobs before the server answers 429")
+    parser.add_argument("--repeat", type=float, default=0.0, help="share of requests repeating an earlier phrase")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request client timeout, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    add_fake_arguments(parser)
+    parser.add_argument("--max-p95", type=float, default=None,
+                        help="exit with code 2 if p95 latency in seconds is above this (regression gate)")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file instead of stdout")
+    return parser
+
+
+def run(args):
+    fake = fake_from_args(args)
+    fake_server = start_fake_sign_mt(fake)
+    fake_url = f"http://127.0.0.1:{fake_server.server_port}/"
+    cache_dir = tempfile.mkdtemp(prefix="sign-loadtest-")
+
+    # get_signs читает настройки из окружения при импорте
+    os.environ["SIGN_MT_URL"] = fake_url
+    os.environ["DRIVER_POOL_SIZE"] = str(args.pool_size)
+    os.environ["MAX_PENDING_JOBS"] = str(args.max_pending)
+    os.environ["VIDEO_CACHE_DIR"] = cache_dir
+    import get_signs
+    from driver_pool import DriverPool
+
+    sampler = ProcessSampler().start()
+    started = time.perf_counter()
+    get_signs.pool = DriverPool(size=args.pool_size, max_uses=get_signs.DRIVER_MAX_USES, url=fake_url).start()
+    pool_start = time.perf_counter() - started
+    server = make_server("127.0.0.1", 0, get_signs.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="loadtest-flask", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    phrases = make_phrases(args.requests, args.repeat, args.seed)
+    results = []
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = [executor.submit(run_client, base_url, text, args.timeout) for text in phrases]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"Request failed: {e}", file=sys.stderr)
+                    results.append(("error", None, 0))
+        wall = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        get_signs.jobs.shutdown()
+        get_signs.pool.close()
+        fake_server.shutdown()
+        sampler.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    outcomes = {}
+    for outcome, _, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    completed = [seconds for outcome, seconds, _ in results if outcome in ("cached", "generated")]
+    generated = [seconds for outcome, seconds, _ in results if outcome == "generated"]
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "pool_size": args.pool_size,
+        "stand_in": {"delay": args.delay, "jitter": args.jitter, "clip_kb": args.clip_kb,
+                     "fail_rate": args.fail_rate, "pages_served": fake.pages_served,
+                     "clips_served": fake.clips_served},
+        "outcomes": outcomes,
+        "pool_start_seconds": round(pool_start, 3),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(completed) / wall, 3) if wall > 0 else None,
+        "latency_seconds": percentiles(completed, LATENCY_QUANTILES, digits=3),
+        "generated_latency_seconds": percentiles(generated, LATENCY_QUANTILES, digits=3),
+        "video_bytes": sum(size for _, _, size in results),
+        "jobs_deduplicated": get_signs.jobs.deduplicated,
+        "jobs_rejected": get_signs.jobs.rejected,
+        "peak_rss_mb": round(sampler.peak_rss / (1 << 20), 1),
+        "peak_browsers": sampler.peak_browsers,
+        # Фазы запросов на стороне сервера (см. metrics.py): где именно тратится время
+        "server_metrics": get_signs.METRICS.snapshot(),
+    }
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = run(args)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    p95 = report["latency_seconds"]["p95"]
+    if args.max_p95 is not None and (p95 is None or p95 > args.max_p95):
+        print(f"p95 latency {p95} s is above the limit of {args.max_p95} s", file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
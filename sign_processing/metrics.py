@@ -0,0 +1,241 @@
+"""Метрики и трассировка запросов генерации видео.
+
+Каждый запрос получает RequestTrace с идентификатором: фазы (ожидание
+браузера, ввод текста, ожидание генерации, передача видео, запись на диск)
+накапливаются в нём через TRACER.phase() и по завершении попадают в
+гистограммы METRICS и в одну JSON-строку лога. Медленные запросы
+выборочно дописываются в отдельный trace-лог целиком.
+"""
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+trace_logger = logging.getLogger("sign_trace")
+
+
+def percentiles(values, quantiles=(0.50, 0.95, 0.99), scale=1.0, digits=6):
+    """Перцентили методом ближайшего ранга и максимум: {"p50": ..., "max": ...}.
+
+    Один метод для гистограмм и отчётов бенчмарков, чтобы их числа были
+    сравнимы (та же функция, что в object_detection/metrics.py); scale
+    переводит единицы. Для пустого values все значения None.
+    """
+    names = [f"p{round(q * 100)}" for q in quantiles] + ["max"]
+    if not len(values):
+        return dict.fromkeys(names)
+    values = sorted(values)
+    picks = [values[max(0, math.ceil(round(q * len(values), 9)) - 1)] for q in quantiles] + [values[-1]]
+    return {name: round(value * scale, digits) for name, value in zip(names, picks)}
+
+
+class RollingHistogram:
+    """Последние window значений плюс накопленные count/sum; перцентили — при чтении"""
+
+    def __init__(self, window=1024):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self):
+        if not self.samples:
+            return {"count": self.count, "sum": self.total}
+        return {"count": self.count, "sum": round(self.total, 6), **percentiles(self.samples)}
+
+
+class Metrics:
+    """Счётчики, гистограммы времён фаз и вычисляемые показатели сервера.
+
+    Урезанная копия реестра object_detection/metrics.py с тем же форматом
+    snapshot и Prometheus: скрипты sign_processing запускаются из своего
+    каталога и пакет детектора не импортируют.
+    """
+
+    def __init__(self, prefix="signs", window=1024):
+        self.prefix = prefix
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}  # name -> функция без аргументов, вызывается при чтении
+        self.started = time.time()
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = RollingHistogram(self.window)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def gauge(self, name, func):
+        """Регистрирует показатель, значение которого берётся из func() при чтении"""
+        with self._lock:
+            self._gauges[name] = func
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {name: h.summary() for name, h in self._histograms.items()}
+            gauges = dict(self._gauges)
+        values = {}
+        for name, func in gauges.items():
+            try:
+                values[name] = func()
+            except Exception:
+                values[name] = None
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "counters": counters,
+            "gauges": values,
+            "timings": histograms,
+        }
+
+    def to_prometheus(self):
+        snap = self.snapshot()
+        prefix = self.prefix
+        lines = []
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, value in sorted(snap["gauges"].items()):
+            if value is not None:
+                lines.append(f"{prefix}_{name} {value}")
+        for name, summary in sorted(snap["timings"].items()):
+            for q in ("p50", "p95", "p99"):
+                if q in summary:
+                    quantile = int(q[1:]) / 100
+                    lines.append(f'{prefix}_{name}_seconds{{quantile="{quantile}"}} {summary[q]}')
+            lines.append(f"{prefix}_{name}_seconds_count {summary['count']}")
+            lines.append(f"{prefix}_{name}_seconds_sum {summary['sum']}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestTrace:
+    """Фазы одного запроса: имя -> [секунды, число вызовов], в порядке первого появления"""
+
+    def __init__(self, request_id=None, text=None, started_at=None):
+        now = time.time()
+        self.request_id = request_id or uuid.uuid4().hex
+        self.text = text
+        # started_at в прошлом (создание задачи) — общее время включает ожидание в очереди
+        self.started_at = started_at or now
+        self.started = time.perf_counter() - (now - self.started_at)
+        self.outcome = None
+        self.error = None
+        self.phases = {}
+
+    def add(self, name, seconds):
+        phase = self.phases.setdefault(name, [0.0, 0])
+        phase[0] += seconds
+        phase[1] += 1
+
+    def to_dict(self, total):
+        return {
+            "request_id": self.request_id,
+            "text": self.text,
+            "outcome": self.outcome,
+            "error": self.error,
+            "started_at": round(self.started_at, 3),
+            "total": round(total, 4),
+            "phases": {name: {"seconds": round(seconds, 4), "count": count}
+                       for name, (seconds, count) in self.phases.items()},
+        }
+
+
+class Tracer:
+    """Текущая трассировка потока и её запись в метрики и логи.
+
+    Время фазы не включает вложенные в неё фазы (склейка, внутри которой
+    генерируется слово, не учитывает ввод текста и ожидание видео второй
+    раз), поэтому фазы запроса в сумме не превышают его общее время. Фазы
+    вне запроса (запуск браузера, перезагрузка страницы в пуле) сразу
+    попадают в гистограммы. Вложенный request() (склейка генерирует
+    недостающие слова) продолжает внешнюю трассировку. Запросы дольше
+    slow_seconds с вероятностью sample_rate дописываются в log_path.
+    """
+
+    def __init__(self, metrics, slow_seconds=20.0, sample_rate=1.0, log_path=None):
+        self.metrics = metrics
+        self.slow_seconds = slow_seconds
+        self.sample_rate = sample_rate
+        self.log_path = log_path
+        self._local = threading.local()
+        self._log_lock = threading.Lock()
+
+    def current(self):
+        return getattr(self._local, "trace", None)
+
+    @contextmanager
+    def request(self, request_id=None, text=None, started_at=None):
+        trace = self.current()
+        if trace is not None:
+            yield trace
+            return
+        trace = self._local.trace = RequestTrace(request_id, text, started_at)
+        try:
+            yield trace
+        except Exception as e:
+            trace.outcome = "error"
+            trace.error = str(e)
+            raise
+        finally:
+            self._local.trace = None
+            self._finish(trace)
+
+    @contextmanager
+    def phase(self, name):
+        stack = getattr(self._local, "nested", None)
+        if stack is None:
+            stack = self._local.nested = []  # время вложенных фаз для каждой открытой фазы
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            own = elapsed - stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            trace = self.current()
+            if trace is None:
+                self.metrics.observe(name, own)
+            else:
+                trace.add(name, own)
+
+    def _finish(self, trace):
+        total = time.perf_counter() - trace.started
+        # В гистограммы идёт сумма фазы за запрос: передача видео кусками — одно значение
+        for name, (seconds, _) in trace.phases.items():
+            self.metrics.observe(name, seconds)
+        self.metrics.observe("request_total", total)
+        self.metrics.inc(f"requests_{trace.outcome or 'done'}")
+        record = trace.to_dict(total)
+        line = json.dumps(record, ensure_ascii=False)
+        trace_logger.info(line)
+        if total < self.slow_seconds:
+            return
+        self.metrics.inc("slow_requests")
+        if self.log_path and random.random() < self.sample_rate:
+            try:
+                with self._log_lock, open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                trace_logger.warning(f"Не удалось записать trace-лог: {e}")
+
+
+# Общий реестр процесса
+METRICS = Metrics(prefix="signs")
+TRACER = Tracer(METRICS)
@@ -0,0 +1,180 @@
+"""Пакетная генерация видео для списка фраз через пул браузеров.
+
+Пример:
+    python pregenerate.py phrases.txt --workers 4
+    python pregenerate.py phrases.jsonl --checkpoint event.progress.jsonl --retries 5
+
+Фразы из кэша пропускаются, неудачные повторяются с нарастающей паузой,
+прогресс дописывается в checkpoint, поэтому прерванный запуск можно
+продолжить той же командой. Готовая по checkpoint фраза, которую кэш уже
+вытеснил, генерируется заново. В конце печатается JSON-отчёт.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import get_signs
+from driver_pool import DriverPool
+from metrics import percentiles
+from video_cache import cache_key
+
+logger = logging.getLogger("pregenerate")
+
+
+def read_phrases(path):
+    """Фразы из текстового файла (по одной в строке, # — комментарий) или JSONL с полем text"""
+    phrases = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                try:
+                    line = json.loads(line)["text"]
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"Строка {line_no}: нет поля text, пропускаю")
+                    continue
+            phrases.append(line.title().strip())
+    # Дубли после нормализации генерируются один раз
+    unique = {}
+    for text in phrases:
+        unique.setdefault(cache_key(text, get_signs.SIGN_LANGUAGE), text)
+    return unique
+
+
+def load_checkpoint(path):
+    """Ключи фраз, уже успешно сгенерированных в прошлых запусках"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # недописанная строка прерванного запуска
+            if record.get("status") == "done":
+                done.add(record["key"])
+    return done
+
+
+def generate_with_retries(text, retries, backoff, compose, stop=None):
+    """(путь или None, попыток, секунд на последнюю попытку); stop прерывает повторы"""
+    stop = stop or threading.Event()
+    for attempt in range(1, retries + 2):
+        started = time.perf_counter()
+        try:
+            _, path = get_signs.get_video(text, compose=compose)
+        except Exception as e:
+            logger.warning(f"«{text}»: попытка {attempt} завершилась ошибкой: {e}")
+            path = None
+        elapsed = time.perf_counter() - started
+        if path:
+            return path, attempt, elapsed
+        if attempt > retries or stop.wait(backoff * 2 ** (attempt - 1)):
+            return None, attempt, elapsed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Pre-generate sign videos for a list of phrases")
+    parser.add_argument("phrases", help="text file with one phrase per line, or JSONL with a text field")
+    parser.add_argument("--workers", type=int, default=get_signs.POOL_SIZE, help="browsers working in parallel")
+    parser.add_argument("--retries", type=int, default=3, help="retries per phrase after the first attempt")
+    parser.add_argument("--backoff", type=float, default=2.0, help="first retry delay in seconds, doubled each time")
+    parser.add_argument("--checkpoint", default=None,
+                        help="progress file for resuming (default: <phrases>.progress.jsonl)")
+    parser.add_argument("--compose", action="store_true",
+                        help="allow assembling phrases from cached words instead of generating them whole")
+    parser.add_argument("--output", default=None, help="write the JSON report to this file instead of stdout")
+    return parser
+
+
+def run(args):
+    phrases = read_phrases(args.phrases)
+    checkpoint_path = args.checkpoint or args.phrases + ".progress.jsonl"
+    done = load_checkpoint(checkpoint_path)
+    # Готовой считается только фраза, видео которой ещё в кэше
+    todo = {key: text for key, text in phrases.items() if not get_signs.video_cache.contains(key)}
+    skipped = len(phrases) - len(todo)
+    evicted = sum(key in done for key in todo)
+    logger.info(f"Фраз: {len(phrases)}, уже готово: {skipped}, к генерации: {len(todo)}"
+                f" (из них вытеснено из кэша: {evicted})")
+
+    timings = []
+    failed = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    started = time.perf_counter()
+    if todo:
+        get_signs.pool = DriverPool(size=args.workers, max_uses=get_signs.DRIVER_MAX_USES).start()
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    try:
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            futures = {executor.submit(generate_with_retries, text, args.retries, args.backoff, args.compose, stop):
+                       (key, text) for key, text in todo.items()}
+            for n, future in enumerate(as_completed(futures), 1):
+                key, text = futures[future]
+                path, attempts, elapsed = future.result()
+                status = "done" if path else "failed"
+                with lock:
+                    # Строка пишется и сбрасывается сразу: прерванный запуск продолжится с этого места
+                    checkpoint.write(json.dumps({"key": key, "text": text, "status": status,
+                                                 "attempts": attempts, "seconds": round(elapsed, 3)},
+                                                ensure_ascii=False) + "\n")
+                    checkpoint.flush()
+                if path:
+                    timings.append(elapsed)
+                else:
+                    failed.append(text)
+                logger.info(f"[{n}/{len(todo)}] {status} «{text}» за {elapsed:.1f} с, попыток: {attempts}")
+    except BaseException:
+        # Ошибка или Ctrl-C: фразы из очереди не запускаются, начатые не повторяются
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        if get_signs.pool is not None:
+            get_signs.pool.close()
+        executor.shutdown()
+
+    wall = time.perf_counter() - started
+    return {
+        "phrases": len(phrases),
+        "skipped": skipped,
+        "regenerated_evicted": evicted,
+        "generated": len(timings),
+        "failed": len(failed),
+        "failed_phrases": failed,
+        "workers": args.workers,
+        "wall_seconds": round(wall, 3),
+        "phrases_per_minute": round(60 * len(timings) / wall, 2) if wall > 0 and timings else None,
+        "seconds_per_phrase": percentiles(timings, (0.50, 0.95), digits=3),
+        "checkpoint": checkpoint_path,
+    }
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        report = run(args)
+    except OSError as e:
+        logger.error(f"Ошибка: {e}")
+        return 1
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if not report["failed"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
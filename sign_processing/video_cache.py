@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def normalize_text(text):
+    """Приводит текст к каноническому виду: одинаковые фразы дают один ключ кэша"""
+    text = unicodedata.normalize("NFC", text)
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(text, language):
+    """Ключ видео: хэш нормализованного текста и пространства имён (language)"""
+    payload = f"{language}\n{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+
+class VideoCache:
+    """Кэш сгенерированных видео на диске с индексом размеров и времени доступа.
+
+    Файл видео называется по ключу, поэтому повторная фраза отдаётся с диска
+    без браузера. Запись идёт во временный файл в том же каталоге и
+    публикуется через os.replace, так что параллельные запросы никогда не
+    видят недописанный файл. При превышении max_bytes удаляются давно не
+    запрошенные видео.
+    """
+
+    INDEX_NAME = "index.json"
+    SAVE_INTERVAL = 30  # Как часто сохранять индекс после одних только чтений, с
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> {"size", "last_access", "text"}
+        self._saved_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.webm")
+
+    def _load(self):
+        index_path = os.path.join(self.directory, self.INDEX_NAME)
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        # Сверяем индекс с каталогом: файлы могли удалить или дописать другим процессом
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext != ".webm" or not KEY_PATTERN.match(key):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entry = entries.get(key) or {"last_access": stat.st_mtime, "text": None}
+            entry["size"] = stat.st_size
+            self._entries[key] = entry
+
+    def _save(self, force=False):
+        """Атомарно записывает индекс; вызывается под self._lock"""
+        now = time.time()
+        if not force and now - self._saved_at < self.SAVE_INTERVAL:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".json.tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, os.path.join(self.directory, self.INDEX_NAME))
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить индекс кэша: {e}")
+            self.discard(tmp_path)
+        self._saved_at = now
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry["size"] for entry in self._entries.values())
+
+    def _lookup(self, key):
+        """Запись индекса для key или None; вызывается под self._lock.
+
+        Видео, записанное в каталог другим процессом (pregenerate.py), в
+        индексе этого процесса ещё нет: оно находится по файлу и добавляется.
+        """
+        try:
+            stat = os.stat(self.path(key))
+        except FileNotFoundError:
+            self._entries.pop(key, None)
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {"size": stat.st_size, "last_access": stat.st_mtime, "text": None}
+            self._evict(keep=key)
+        return entry
+
+    def get(self, key, count=True):
+        """Путь к готовому видео или None; обновляет время доступа для LRU.
+
+        hits/misses считают запросы пользователей: внутренние повторные
+        проверки того же ключа передают count=False.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            entry["last_access"] = time.time()
+            if count:
+                self.hits += 1
+            self._save()
+        return self.path(key)
+
+    def contains(self, key):
+        """Есть ли видео в кэше; в отличие от get() не влияет на статистику и LRU"""
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def temp_path(self, key):
+        """Временный файл для записи видео; публикуется через commit()"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f"{key}.", suffix=".part")
+        os.close(fd)
+        return tmp_path
+
+    def commit(self, key, tmp_path, text=None):
+        """Атомарно публикует записанное видео под ключом и освобождает место под бюджет"""
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, self.path(key))
+        with self._lock:
+            self._entries[key] = {"size": size, "last_access": time.time(), "text": text}
+            self._evict(keep=key)
+            self._save(force=True)
+        return self.path(key)
+
+    @staticmethod
+    def discard(tmp_path):
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep=None):
+        total = sum(entry["size"] for entry in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= self._entries.pop(key)["size"]
+            self.discard(self.path(key))
+            logger.info(f"Видео {key} удалено из кэша")
@@ -0,0 +1,232 @@
+"""Склейка WebM-клипов без перекодирования.
+
+Клипы sign.mt записаны одним генератором с одинаковыми дорожками, поэтому
+их кластеры можно переписать в один Segment подряд, сдвинув только
+абсолютные метки времени кластеров. Кадры копируются байт в байт.
+"""
+import mmap
+import struct
+
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+INFO = 0x1549A966
+TRACKS = 0x1654AE6B
+CLUSTER = 0x1F43B675
+CUES = 0x1C53BB6B
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+SEGMENT_UID = 0x73A4
+CLUSTER_TIMECODE = 0xE7
+POSITION = 0xA7
+PREV_SIZE = 0xAB
+SIMPLE_BLOCK = 0xA3
+BLOCK_GROUP = 0xA0
+BLOCK = 0xA1
+
+# Элементы верхнего уровня Segment: ими заканчивается кластер неизвестного размера
+SEGMENT_CHILDREN = {SEEK_HEAD, INFO, TRACKS, CLUSTER, CUES, 0x1043A770, 0x1254C367, 0x1941A469}
+DEFAULT_TIMECODE_SCALE = 1000000  # нс на единицу метки времени
+
+
+def _read_vint(buf, pos, keep_marker=False):
+    """Читает EBML-число переменной длины; возвращает (значение, длина, неизвестный_размер)"""
+    first = buf[pos]
+    if first == 0:
+        raise ValueError(f"Invalid EBML variable-length integer at {pos}")
+    length = 1
+    mask = 0x80
+    while not first & mask:
+        mask >>= 1
+        length += 1
+    value = first if keep_marker else first & (mask - 1)
+    for i in range(1, length):
+        value = (value << 8) | buf[pos + i]
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+
+def _elements(buf, start, end, stop_ids=()):
+    """Перебирает элементы (id, начало элемента, начало данных, конец данных) в [start, end)"""
+    pos = start
+    while pos < end:
+        element_id, id_len, _ = _read_vint(buf, pos, keep_marker=True)
+        if element_id in stop_ids:
+            return
+        size, size_len, unknown = _read_vint(buf, pos + id_len)
+        data_start = pos + id_len + size_len
+        data_end = end if unknown else min(data_start + size, end)
+        yield element_id, pos, data_start, data_end
+        pos = data_end
+
+
+def _encode_id(element_id):
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+
+
+def _encode_size(size):
+    for length in range(1, 9):
+        if size < (1 << (7 * length)) - 1:
+            return (size | (1 << (7 * length))).to_bytes(length, "big")
+    raise ValueError(f"Element too large: {size}")
+
+
+def _element(element_id, payload):
+    return _encode_id(element_id) + _encode_size(len(payload)) + payload
+
+
+def _encode_uint(value):
+    return value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big")
+
+
+class _Clip:
+    """Разобранный клип: заголовки, кластеры и длительность"""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.ebml_header = None
+        self.info = []  # (id, start, end) дочерних элементов Info
+        self.tracks = None
+        self.timecode_scale = DEFAULT_TIMECODE_SCALE
+        self.duration = None  # в единицах timecode_scale
+        self.clusters = []  # (timecode, [(start, end) блоков и прочих элементов кластера])
+        self._parse()
+
+    def _parse(self):
+        buf = self.buf
+        for element_id, start, data_start, data_end in _elements(buf, 0, len(buf)):
+            if element_id == EBML_HEADER:
+                self.ebml_header = bytes(buf[start:data_end])
+            elif element_id == SEGMENT:
+                self._parse_segment(data_start, data_end)
+        if self.ebml_header is None or self.tracks is None:
+            raise ValueError("Not a WebM file")
+
+    def _parse_segment(self, start, end):
+        buf = self.buf
+        pos = start
+        while pos < end:
+            element_id, id_len, _ = _read_vint(buf, pos, keep_marker=True)
+            size, size_len, unknown = _read_vint(buf, pos + id_len)
+            data_start = pos + id_len + size_len
+            data_end = end if unknown else min(data_start + size, end)
+            if element_id == CLUSTER:
+                # Размер кластера может быть неизвестен (MediaRecorder): конец находим по содержимому
+                data_end = self._parse_cluster(data_start, data_end)
+            elif unknown:
+                raise ValueError("Unsupported unknown-size element in WebM segment")
+            elif element_id == INFO:
+                for child_id, child_start, child_data, child_end in _elements(buf, data_start, data_end):
+                    if child_id == TIMECODE_SCALE:
+                        self.timecode_scale = int.from_bytes(buf[child_data:child_end], "big")
+                    elif child_id == DURATION:
+                        raw = bytes(buf[child_data:child_end])
+                        self.duration = struct.unpack(">f" if len(raw) == 4 else ">d", raw)[0]
+                    self.info.append((child_id, child_start, child_end))
+            elif element_id == TRACKS:
+                self.tracks = bytes(buf[pos:data_end])
+            pos = data_end
+
+    def _parse_cluster(self, start, end):
+        buf = self.buf
+        timecode = 0
+        parts = []
+        pos = start
+        for child_id, child_start, child_data, child_end in _elements(buf, start, end, SEGMENT_CHILDREN):
+            if child_id == CLUSTER_TIMECODE:
+                timecode = int.from_bytes(buf[child_data:child_end], "big")
+            elif child_id not in (POSITION, PREV_SIZE):
+                # Позиции относятся к старому файлу, остальное копируется как есть
+                parts.append((child_start, child_end))
+            pos = child_end
+        self.clusters.append((timecode, parts))
+        return pos
+
+    def _block_time(self, start, end):
+        """Относительная метка времени блока (SimpleBlock или Block внутри BlockGroup)"""
+        buf = self.buf
+        element_id, id_len, _ = _read_vint(buf, start, keep_marker=True)
+        _, size_len, _ = _read_vint(buf, start + id_len)
+        data = start + id_len + size_len
+        if element_id == BLOCK_GROUP:
+            for child_id, _, child_data, child_end in _elements(buf, data, end):
+                if child_id == BLOCK:
+                    data = child_data
+                    break
+            else:
+                return None
+        elif element_id != SIMPLE_BLOCK:
+            return None
+        _, track_len, _ = _read_vint(buf, data)
+        return struct.unpack(">h", bytes(buf[data + track_len:data + track_len + 2]))[0]
+
+    def span(self):
+        """(первая метка времени, длительность) клипа в единицах timecode_scale"""
+        times = []
+        for timecode, parts in self.clusters:
+            for start, end in parts:
+                relative = self._block_time(start, end)
+                if relative is not None:
+                    times.append(timecode + relative)
+        if not times:
+            return 0, self.duration or 0
+        first = min(times)
+        if self.duration:
+            return first, self.duration
+        # Без Duration длительность — до последнего кадра плюс средний интервал между кадрами
+        last = max(times)
+        step = (last - first) / (len(times) - 1) if len(times) > 1 else 0
+        return first, last - first + step
+
+
+def concat_webm(paths, out):
+    """Склеивает WebM-файлы paths в поток out без перекодирования.
+
+    Все клипы должны иметь одинаковые дорожки (кодек, размер кадра,
+    CodecPrivate); иначе ValueError. Возвращает длительность в секундах.
+    """
+    maps = []
+    try:
+        clips = []
+        for path in paths:
+            # mmap: кадры копируются в out срезами, файлы целиком в память не читаются
+            with open(path, "rb") as f:
+                maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            clips.append(_Clip(maps[-1]))
+        if not clips:
+            raise ValueError("Nothing to concatenate")
+        first = clips[0]
+        for clip in clips[1:]:
+            if clip.tracks != first.tracks or clip.timecode_scale != first.timecode_scale:
+                raise ValueError("Clips have different tracks and cannot be joined without re-encoding")
+
+        # Новые заголовки кластеров: метка времени сдвигается на длительность предыдущих клипов
+        clusters = []
+        offset = 0.0
+        for clip in clips:
+            clip_start, duration = clip.span()
+            for timecode, parts in clip.clusters:
+                shifted = max(0, round(timecode - clip_start + offset))
+                timecode_el = _element(CLUSTER_TIMECODE, _encode_uint(shifted))
+                size = len(timecode_el) + sum(end - start for start, end in parts)
+                header = _encode_id(CLUSTER) + _encode_size(size) + timecode_el
+                clusters.append((clip, header, parts, len(header) - len(timecode_el) + size))
+            offset += duration
+
+        info_payload = b"".join(bytes(first.buf[start:end]) for element_id, start, end in first.info
+                                if element_id not in (DURATION, SEGMENT_UID))
+        info = _element(INFO, info_payload + _element(DURATION, struct.pack(">d", offset)))
+        segment_size = len(info) + len(first.tracks) + sum(total for _, _, _, total in clusters)
+
+        out.write(first.ebml_header)
+        out.write(_encode_id(SEGMENT) + _encode_size(segment_size))
+        out.write(info)
+        out.write(first.tracks)
+        for clip, header, parts, _ in clusters:
+            out.write(header)
+            for start, end in parts:
+                out.write(clip.buf[start:end])
+        return offset * first.timecode_scale / 1e9
+    finally:
+        for buf in maps:
+            buf.close()
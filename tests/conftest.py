@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Скрипты sign_processing импортируют друг друга как модули верхнего уровня
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sign_processing"))
@@ -0,0 +1,21 @@
+from object_detection.audio import AudioEngine
+from object_detection.tts import announcement_text
+
+
+def test_same_label_merges_only_within_a_source():
+    engine = AudioEngine(phrase_cache=None, cooldown=0.0)
+    engine.submit("person", 2.0, source="camera 1")
+    engine.submit("person", 1.0, source="camera 1")
+    engine.submit("person", 3.0, source="camera 2")
+
+    first = engine._take_next()
+    second = engine._take_next()
+    assert first[1:] == ("person", 2, 1.0, "camera 1")
+    assert second[1:] == ("person", 1, 3.0, "camera 2")
+    assert engine._take_next() is None
+
+
+def test_announcement_names_the_source():
+    assert announcement_text("person", 1.0) == "New person detected at distance 1.0 meters"
+    assert announcement_text("car", 2.0, count=2, source="camera 2") == \
+        "2 cars detected on camera 2, nearest at distance 2.0 meters"
@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+from jobs import DONE, QUEUED, JobManager, QueueFull
+
+
+class BlockingRun:
+    """Исполнитель задач, который ждёт release(); путь к видео — текст задачи"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.released = threading.Event()
+        self.calls = []
+
+    def __call__(self, job):
+        self.calls.append((job.text, threading.current_thread().name))
+        self.started.set()
+        assert self.released.wait(5)
+        return f"/videos/{job.text}.webm"
+
+
+@pytest.fixture
+def run():
+    run = BlockingRun()
+    yield run
+    run.released.set()
+
+
+def test_same_key_joins_the_running_job(run):
+    manager = JobManager(run, workers=1, max_pending=4)
+    job, created = manager.submit("k", "Hello")
+    again, created_again = manager.submit("k", "Hello")
+
+    assert created and not created_again
+    assert again is job
+    assert manager.deduplicated == 1
+    run.released.set()
+    assert job.wait(5) and job.status == DONE
+    assert len(run.calls) == 1
+    manager.shutdown()
+
+
+def test_full_queue_is_rejected(run):
+    manager = JobManager(run, workers=1, max_pending=1)
+    manager.submit("a", "A")
+    assert run.started.wait(5)
+    queued, _ = manager.submit("b", "B")
+    assert queued.status == QUEUED
+
+    with pytest.raises(QueueFull):
+        manager.submit("c", "C")
+    assert manager.rejected == 1
+    # Дубль ожидающей задачи не занимает место в очереди
+    assert manager.submit("b", "B")[0] is queued
+    manager.shutdown()
+
+
+def test_run_inline_takes_over_a_queued_job(run):
+    manager = JobManager(run, workers=1, max_pending=4)
+    manager.submit("a", "A")
+    assert run.started.wait(5)
+    queued, _ = manager.submit("b", "B")
+
+    run.released.set()
+    assert manager.run_inline("b", "B") == "/videos/B.webm"
+    assert queued.status == DONE
+    assert ("B", threading.current_thread().name) in run.calls
+    manager.shutdown()
+
+
+def test_api_answers_429_when_the_queue_is_full(run, tmp_path, monkeypatch):
+    monkeypatch.setenv("VIDEO_CACHE_DIR", str(tmp_path))
+    import get_signs
+    from video_cache import VideoCache
+
+    monkeypatch.setattr(get_signs, "video_cache", VideoCache(str(tmp_path)))
+    monkeypatch.setattr(get_signs, "jobs", JobManager(run, workers=1, max_pending=1))
+    client = get_signs.app.test_client()
+
+    running = client.post("/api/jobs", json={"text": "first"})
+    assert running.status_code == 202
+    assert run.started.wait(5)
+    queued = client.post("/api/jobs", json={"text": "second"})
+    duplicate = client.post("/api/jobs", json={"text": "SECOND"})
+    rejected = client.post("/api/jobs", json={"text": "third"})
+
+    assert queued.status_code == duplicate.status_code == 202
+    assert duplicate.headers["X-Request-ID"] == queued.headers["X-Request-ID"]
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == str(get_signs.RETRY_AFTER_SECONDS)
+    get_signs.jobs.shutdown()
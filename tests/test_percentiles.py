@@ -0,0 +1,20 @@
+import pytest
+
+import metrics as sign_metrics
+from object_detection import metrics as detector_metrics
+
+
+@pytest.mark.parametrize("percentiles", [detector_metrics.percentiles, sign_metrics.percentiles])
+def test_nearest_rank(percentiles):
+    values = list(range(1, 101))
+    assert percentiles(values) == {"p50": 50, "p95": 95, "p99": 99, "max": 100}
+    assert percentiles([0.5, 0.1], (0.5, 0.9), scale=1000, digits=3) == {"p50": 100.0, "p90": 500.0, "max": 500.0}
+    assert percentiles([], (0.5,)) == {"p50": None, "max": None}
+
+
+def test_histogram_uses_the_same_percentiles():
+    histogram = detector_metrics.RollingHistogram()
+    for value in range(1, 101):
+        histogram.observe(value / 1000)
+    summary = histogram.summary()
+    assert (summary["p50"], summary["p99"], summary["max"]) == (0.05, 0.099, 0.1)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from object_detection.scheduler import DetectionScheduler
+
+
+def frame(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def test_budget_is_shared_between_sources():
+    scheduler = DetectionScheduler(every_n=1, max_duty=0.5)
+    assert scheduler.should_detect("a", frame(0), 0.0)
+    assert scheduler.should_detect("b", frame(0), 0.0)
+    scheduler.record_inference(0.1, now=0.0)  # интервал 0.1 / 0.5 = 0.2 с
+
+    # Источник b не может вызвать модель сразу после вызова для a
+    assert scheduler.should_detect("a", frame(0), 0.25)
+    scheduler.record_inference(0.1, now=0.25)
+    assert not scheduler.should_detect("b", frame(0), 0.3)
+    assert scheduler.should_detect("b", frame(0), 0.5)
+
+
+def test_sources_in_one_cycle_share_a_call():
+    scheduler = DetectionScheduler(every_n=1, max_duty=0.5)
+    for source in ("a", "b"):
+        scheduler.should_detect(source, frame(0), 0.0)
+    scheduler.record_inference(0.1, now=0.0)
+
+    assert [scheduler.should_detect(s, frame(0), 0.2) for s in ("a", "b")] == [True, True]
+
+
+def test_static_frames_wait_for_every_n():
+    scheduler = DetectionScheduler(every_n=3, max_duty=None)
+    assert scheduler.should_detect(0, frame(0), 0.0)
+    assert not scheduler.should_detect(0, frame(0), 0.1)
+    assert not scheduler.should_detect(0, frame(0), 0.2)
+    assert scheduler.should_detect(0, frame(0), 0.3)
+    # Движение запускает детекцию сразу
+    assert scheduler.should_detect(0, frame(100), 0.4)
@@ -0,0 +1,33 @@
+import time
+
+from metrics import Metrics, Tracer
+
+
+def test_queue_wait_is_part_of_request_total():
+    metrics = Metrics()
+    tracer = Tracer(metrics)
+    created = time.time() - 1.0
+    with tracer.request("job", "Hello", started_at=created) as trace:
+        trace.add("queue_wait", time.time() - created)
+        with tracer.phase("typing"):
+            time.sleep(0.01)
+
+    timings = metrics.snapshot()["timings"]
+    phases = timings["queue_wait"]["sum"] + timings["typing"]["sum"]
+    assert timings["request_total"]["sum"] >= phases
+
+
+def test_nested_phases_are_not_counted_twice():
+    metrics = Metrics()
+    tracer = Tracer(metrics)
+    with tracer.request() as trace:
+        with tracer.phase("compose"):
+            time.sleep(0.02)
+            with tracer.request() as inner:
+                assert inner is trace
+                with tracer.phase("typing"):
+                    time.sleep(0.02)
+
+    assert trace.phases["compose"][0] < 0.035
+    timings = metrics.snapshot()["timings"]
+    assert timings["compose"]["sum"] + timings["typing"]["sum"] <= timings["request_total"]["sum"]
@@ -0,0 +1,47 @@
+import numpy as np
+
+from object_detection.tracker import IoUTracker
+
+BOX = [100, 100, 200, 200]
+
+
+def test_jittered_box_keeps_track():
+    tracker = IoUTracker(timeout=2.0)
+    ids, is_new = tracker.update([BOX], [0], now=0.0)
+    assert is_new.tolist() == [True]
+    ids2, is_new2 = tracker.update([[105, 98, 206, 203]], [0], now=0.5)
+    assert is_new2.tolist() == [False]
+    assert ids2.tolist() == ids.tolist()
+
+
+def test_different_class_is_new_track():
+    tracker = IoUTracker(timeout=2.0)
+    tracker.update([BOX], [0], now=0.0)
+    _, is_new = tracker.update([BOX], [1], now=0.1)
+    assert is_new.tolist() == [True]
+
+
+def test_object_returning_after_timeout_is_new():
+    tracker = IoUTracker(timeout=2.0)
+    ids, _ = tracker.update([BOX], [0], now=0.5)
+    # Обновления редкие (адаптивный планировщик): следующее — через 5 с
+    ids2, is_new = tracker.update([BOX], [0], now=5.5)
+    assert is_new.tolist() == [True]
+    assert ids2[0] != ids[0]
+    assert len(tracker) == 1
+
+
+def test_object_within_timeout_is_not_new():
+    tracker = IoUTracker(timeout=2.0)
+    ids, _ = tracker.update([BOX], [0], now=0.5)
+    tracker.update(np.empty((0, 4)), [], now=1.5)
+    ids2, is_new = tracker.update([BOX], [0], now=2.4)
+    assert is_new.tolist() == [False]
+    assert ids2.tolist() == ids.tolist()
+
+
+def test_unmatched_tracks_expire():
+    tracker = IoUTracker(timeout=2.0)
+    tracker.update([BOX], [0], now=0.0)
+    tracker.update([[400, 400, 450, 450]], [0], now=3.0)
+    assert len(tracker) == 1
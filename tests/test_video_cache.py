@@ -0,0 +1,62 @@
+import json
+import os
+
+from video_cache import VideoCache, cache_key
+
+
+def put(cache, text, size):
+    key = cache_key(text, "en-ase")
+    tmp = cache.temp_path(key)
+    with open(tmp, "wb") as f:
+        f.write(b"x" * size)
+    cache.commit(key, tmp, text)
+    return key
+
+
+def test_least_recently_used_video_is_evicted(tmp_path):
+    cache = VideoCache(str(tmp_path), max_bytes=250)
+    first = put(cache, "Hello", 100)
+    second = put(cache, "World", 100)
+    assert cache.get(first)  # first теперь использовался позже second
+
+    third = put(cache, "Again", 100)
+    assert cache.contains(first) and cache.contains(third)
+    assert not cache.contains(second)
+    assert not os.path.exists(cache.path(second))
+    assert cache.total_bytes() == 200
+
+
+def test_committed_video_is_kept_even_if_over_budget(tmp_path):
+    cache = VideoCache(str(tmp_path), max_bytes=50)
+    key = put(cache, "Big", 100)
+    assert cache.get(key) == cache.path(key)
+
+
+def test_video_written_by_another_process_is_adopted(tmp_path):
+    server = VideoCache(str(tmp_path), max_bytes=250)
+    old = put(server, "Old", 100)
+    put(server, "Newer", 100)
+
+    # pregenerate.py пишет в тот же каталог своим экземпляром кэша
+    batch = VideoCache(str(tmp_path), max_bytes=250)
+    key = put(batch, "Pregenerated", 100)
+
+    assert server.get(key, count=False) == server.path(key)
+    assert server.hits == 0 and server.misses == 0
+    # Принятое видео учитывается в бюджете: вытесняется самое старое
+    assert not server.contains(old)
+
+
+def test_index_is_rebuilt_from_the_directory(tmp_path):
+    cache = VideoCache(str(tmp_path))
+    key = put(cache, "Hello", 10)
+    with open(tmp_path / "stray.webm.part", "wb") as f:
+        f.write(b"partial")
+    with open(tmp_path / VideoCache.INDEX_NAME) as f:
+        assert json.load(f)[key]["text"] == "Hello"
+
+    reopened = VideoCache(str(tmp_path))
+    assert reopened.get(key) == reopened.path(key)
+    assert reopened.total_bytes() == 10
+    assert reopened.get(cache_key("Missing", "en-ase")) is None
+    assert (reopened.hits, reopened.misses) == (1, 1)
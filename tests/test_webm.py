@@ -0,0 +1,32 @@
+import os
+
+import cv2
+import pytest
+
+from webm import concat_webm
+
+CLIP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    "sign_processing", "static", "videos", "HowAreYou.webm")
+
+
+def read_frames(path):
+    cap = cv2.VideoCapture(str(path))
+    frames = 0
+    while cap.read()[0]:
+        frames += 1
+    cap.release()
+    return frames
+
+
+def test_concat_keeps_every_frame(tmp_path):
+    out = tmp_path / "twice.webm"
+    with open(out, "wb") as f:
+        duration = concat_webm([CLIP, CLIP], f)
+
+    assert duration == pytest.approx(14.08, abs=0.01)
+    assert read_frames(out) == 2 * read_frames(CLIP)
+
+
+def test_concat_of_nothing_is_an_error(tmp_path):
+    with open(tmp_path / "empty.webm", "wb") as f, pytest.raises(ValueError):
+        concat_webm([], f)